@@ -0,0 +1,40 @@
+""" Measures the cost of AnimationClock.advance() per frame with many animated sprites.
+
+    Usage (from the repository root): python -m benchmarks.animation
+"""
+
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from classes import *
+
+SPRITE_COUNTS = (10, 100, 1000, 10000)
+FRAMES = 6000 # 100 seconds of game time at 60 FPS
+FRAME_TIME = 16
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((256, 144))
+
+    game_res = GameResolution((2560, 1440), (2560, 1440), Point(1, 1))
+    template = AnimatedImage("images/miners", 1000, game_res, AnimationClock())
+
+    for count in SPRITE_COUNTS:
+        clock = AnimationClock()
+        for i in range(count):
+            # Share the template's frames instead of loading the images again, with frame lengths spread from 500 to 1500ms
+            AnimatedImage.from_frames(template.frames, 500 + i % 1000, clock)
+
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            clock.advance(FRAME_TIME)
+        elapsed = time.perf_counter() - start
+
+        print(f"{count:>6} sprites: {elapsed / FRAMES * 1e6:8.1f}us per frame")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+""" Load generator for the game server.
+
+    Opens a number of connections, creates sessions spread over them, and then has every connection play random actions on its
+    sessions as fast as the server answers, keeping a fixed number of requests in flight. Every so often a request is a leaderboard
+    query instead. Reports requests per second and latency percentiles over the measured part of the run, which starts once every
+    session has been created.
+
+    One Python process can only generate so much load, so --processes splits the connections over several processes. Their
+    latencies are merged before the percentiles are taken.
+
+    Usage (from the repository root):
+        python -m benchmarks.load_generator --spawn                       # starts its own server on the default address
+        python -m benchmarks.load_generator --address unix:/tmp/spacemines.sock --spawn --connections 200 --sessions 10000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Roughly how a player spreads their clicks
+ACTIONS = ("NEXT_YEAR", "SELL_ORE", "BUY_MINE", "SELL_MINE", "BUY_FOOD")
+ACTION_WEIGHTS = (3, 3, 2, 1, 1)
+
+###############
+##### Load
+
+async def open_connection(address):
+    kind, location = server.parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(location)
+    return await asyncio.open_connection(*location)
+
+async def call(reader, writer, request):
+    writer.write(server.pack_message(request))
+    return await server.read_message(reader)
+
+async def player(address, sessions, depth, leaderboard_every, ready, start, duration, results):
+    """ One connection. Creates its sessions, waits for every other connection to do the same, then keeps depth requests in flight. """
+
+    reader, writer = await open_connection(address)
+    tokens = [(await call(reader, writer, {"op": "new"}))["session"] for _ in range(sessions)]
+    ready()
+    await start.wait()
+
+    rng = random.Random()
+    deadline = time.perf_counter() + duration
+    in_flight = {} # request id -> time sent
+    next_id = 0
+
+    def send():
+        nonlocal next_id
+        next_id += 1
+        if leaderboard_every and next_id % leaderboard_every == 0:
+            request = {"op": "leaderboard", "id": next_id, "count": 10}
+        else:
+            request = {"op": "act", "id": next_id, "session": rng.choice(tokens), "action": rng.choices(ACTIONS, ACTION_WEIGHTS)[0]}
+        in_flight[next_id] = time.perf_counter()
+        writer.write(server.pack_message(request))
+
+    for _ in range(depth):
+        send()
+
+    while in_flight:
+        response = await server.read_message(reader)
+        now = time.perf_counter()
+        results["latencies"].append(now - in_flight.pop(response["id"]))
+        if not response["ok"]:
+            results["errors"] += 1
+        if now < deadline:
+            send()
+
+    writer.close()
+    await writer.wait_closed()
+
+async def generate(address, connections, sessions, depth, leaderboard_every, duration):
+    """ Returns (latencies in seconds, errors, measured seconds, seconds spent creating sessions). """
+
+    results = {"latencies": array("d"), "errors": 0}
+    start = asyncio.Event()
+    waiting = [connections]
+
+    def ready():
+        waiting[0] -= 1
+        if not waiting[0]:
+            start.set()
+
+    per_connection = [sessions // connections + (number < sessions % connections) for number in range(connections)]
+    setup_start = time.perf_counter()
+    tasks = [asyncio.create_task(player(address, max(1, count), depth, leaderboard_every, ready, start, duration, results)) for count in per_connection]
+
+    await start.wait()
+    measure_start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - measure_start
+
+    return results["latencies"], results["errors"], elapsed, measure_start - setup_start
+
+def run_process(address, connections, sessions, depth, leaderboard_every, duration):
+    """ One unit of work for the process pool. Latencies cross the process boundary as raw bytes. """
+    latencies, errors, elapsed, setup_time = asyncio.run(generate(address, connections, sessions, depth, leaderboard_every, duration))
+    return latencies.tobytes(), errors, elapsed, setup_time
+
+###############
+##### Server
+
+def spawn_server(address):
+    """ Starts server.py in its own process and waits until it accepts connections. """
+
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--address", address], cwd = ROOT, stdout = subprocess.DEVNULL)
+
+    async def probe():
+        reader, writer = await open_connection(address)
+        writer.close()
+
+    for _ in range(100):
+        try:
+            asyncio.run(probe())
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            time.sleep(0.05)
+
+    process.terminate()
+    raise RuntimeError(f"Server did not start listening on {address}")
+
+def server_stats(address):
+    async def fetch():
+        reader, writer = await open_connection(address)
+        response = await call(reader, writer, {"op": "stats"})
+        writer.close()
+        return response
+    return asyncio.run(fetch())
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure game server throughput and latency")
+    parser.add_argument("--address", default = server.DEFAULT_ADDRESS, help = "HOST:PORT or unix:PATH")
+    parser.add_argument("--spawn", action = "store_true", help = "start a server at the address for the run")
+    parser.add_argument("--connections", type = int, default = 100)
+    parser.add_argument("--sessions", type = int, default = 5000, help = "colonies, spread evenly over the connections")
+    parser.add_argument("--depth", type = int, default = 4, help = "requests in flight per connection")
+    parser.add_argument("--leaderboard-every", type = int, default = 100, help = "every Nth request is a leaderboard query, 0 for none")
+    parser.add_argument("--duration", type = float, default = 10)
+    parser.add_argument("--processes", type = int, default = 1)
+    args = parser.parse_args()
+    args.processes = max(1, min(args.processes, args.connections)) # Every process needs at least one connection
+
+    process = spawn_server(args.address) if args.spawn else None
+    try:
+        split = lambda total, number: total // args.processes + (number < total % args.processes)
+        with ProcessPoolExecutor(max_workers = args.processes) as pool:
+            futures = [pool.submit(run_process, args.address, split(args.connections, number), split(args.sessions, number), args.depth, args.leaderboard_every, args.duration)
+                       for number in range(args.processes)]
+            results = [future.result() for future in futures]
+        stats = server_stats(args.address)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    latencies = array("d")
+    for data, _, _, _ in results:
+        latencies.frombytes(data)
+    errors = sum(result[1] for result in results)
+    elapsed = max(result[2] for result in results)
+    setup_time = max(result[3] for result in results)
+
+    cuts = statistics.quantiles(latencies, n = 100)
+    print(f"{args.sessions} sessions on {args.connections} connections, {args.depth} in flight each, created in {setup_time:.2f}s")
+    print(f"{len(latencies):,} requests in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} requests/s, {errors} errors")
+    print(f"latency p50 {cuts[49] * 1000:.2f}ms  p90 {cuts[89] * 1000:.2f}ms  p99 {cuts[98] * 1000:.2f}ms  max {max(latencies) * 1000:.2f}ms")
+    print(f"server: {stats['sessions']} sessions, {stats['requests']:,} requests served")
+
+if __name__ == "__main__":
+    main()
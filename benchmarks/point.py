@@ -0,0 +1,137 @@
+""" Point allocations and time per frame, before and after Point was slotted.
+
+    Replays the Point work of one game frame: positioning 16 miners and 16 houses, 5 centred button images, and mapping the cursor
+    into an infobox. "before" uses a copy of the original dataclass Point and the original Image.render arithmetic, "after" uses
+    classes.Point and the current Image.render.
+
+    Usage (from the repository root): python -m benchmarks.point
+"""
+
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from classes import *
+
+FRAMES = 20000
+
+@dataclass
+class LegacyPoint:
+    """ classes.Point as it was before, kept here for comparison. """
+
+    x: int
+    y: int
+
+    def __add__(self, other):
+        return LegacyPoint(self.x + other.x, self.y + other.y)
+    def __sub__(self, other):
+        return LegacyPoint(self.x - other.x, self.y - other.y)
+    def __mul__(self, scalar):
+        if isinstance(scalar, self.__class__):
+            return LegacyPoint(self.x * scalar.x, self.y * scalar.y)
+        elif isinstance(scalar, tuple):
+            return LegacyPoint(self.x * scalar[0], self.y * scalar[1])
+        else:
+            return LegacyPoint(self.x * scalar, self.y * scalar)
+    def __len__(self):
+        return int(math.sqrt(self.x ** 2 + self.y ** 2))
+
+    def tuple(self):
+        return (self.x, self.y)
+
+class NullScreen:
+    def blit(self, source, dest, area = None):
+        pass
+
+class FakeImage:
+    """ Just enough of an Image for render(), without needing a display. """
+
+    def __init__(self, render, point_class):
+        self.scaling_factor = point_class(0.75, 0.75)
+        self.image = self.source = pygame.Surface((120, 90))
+        self.area = None
+        self.render_function = render
+
+    def render(self, screen, pos, centered = False):
+        self.render_function(self, screen, pos, centered)
+
+def legacy_render(self, screen, pos, centered = False):
+    render_pos = pos * self.scaling_factor
+    if centered:
+        render_pos -= LegacyPoint(self.image.get_width() / 2, self.image.get_height() / 2)
+    screen.blit(self.source, render_pos.tuple(), self.area)
+
+def current_render(self, screen, pos, centered = False):
+    Image.render(self, screen, pos, centered)
+
+def legacy_screen_to_local(pos, scaled_size, size):
+    adjusted = LegacyPoint(pos.x - (1920 / 2 - scaled_size.x / 2), pos.y - (1080 / 2 - scaled_size.y / 2))
+    return (adjusted * (size.x / scaled_size.x)).tuple()
+
+def current_screen_to_local(pos, scaled_size, size):
+    adjusted = Point(pos.x - (1920 / 2 - scaled_size.x / 2), pos.y - (1080 / 2 - scaled_size.y / 2))
+    adjusted *= size.x / scaled_size.x
+    return adjusted.tuple()
+
+def make_frame(point_class, render, screen_to_local):
+    screen = NullScreen()
+    sprite = FakeImage(render, point_class)
+    sprite_positions = [point_class(200 + i * 140, 300 + (i % 4) * 160) for i in range(32)]
+    button_positions = [point_class(400 + i * 600, 1300) for i in range(5)]
+    size, scaled_size = point_class(1200, 700), point_class(900, 525)
+    mouse = point_class(960, 540)
+
+    def frame():
+        for position in sprite_positions:
+            sprite.render(screen, position)
+        for position in button_positions:
+            sprite.render(screen, position, True)
+        screen_to_local(mouse, scaled_size, size)
+
+    return frame
+
+def count_instances(point_class, frame):
+    """ Number of point_class objects created in one frame. """
+
+    created = [0]
+    original_init = point_class.__init__
+
+    def counting_init(self, *args):
+        created[0] += 1
+        original_init(self, *args)
+
+    point_class.__init__ = counting_init
+    try:
+        frame()
+    finally:
+        point_class.__init__ = original_init
+    return created[0]
+
+def measure(name, point_class, render, screen_to_local):
+    frame = make_frame(point_class, render, screen_to_local)
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        frame()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    frame()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = tracemalloc_size(point_class)
+    print(f"{name:<8}{elapsed / FRAMES * 1e6:10.1f}us/frame{count_instances(point_class, frame):>8} Points/frame{size:>8} bytes/Point{peak:>10} peak bytes")
+
+def tracemalloc_size(point_class):
+    tracemalloc.start()
+    point = point_class(1, 2)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del point
+    return size
+
+if __name__ == "__main__":
+    measure("before", LegacyPoint, legacy_render, legacy_screen_to_local)
+    measure("after", Point, current_render, current_screen_to_local)
@@ -0,0 +1,188 @@
+""" Headless render benchmark.
+
+    Runs the real game scenes from game.py with SDL_VIDEODRIVER=dummy for a fixed number of frames at several scaling factors,
+    and reports frames per second and Python memory allocated per frame. Each scaling factor runs in its own process, since
+    game.py sets up its window and assets when it is imported.
+
+    Usage (from the repository root):
+        python -m benchmarks.render                  # run and compare against benchmarks/render_baseline.json
+        python -m benchmarks.render --save-baseline  # run and store the results as the new baseline
+        python -m benchmarks.render --scales 1 --render-scales 1 0.75 0.5 --scenes full_redraw  # cost of render scale mode
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "render_baseline.json")
+
+SCALING_FACTORS = (1.0, 0.75, 0.5)
+SCENES = ("idle", "full_field", "huge_field", "infobox_zoom", "dial", "full_redraw")
+FRAME_TIME = 16 # Fixed delta so every run animates the same way
+
+###############
+##### Scenes
+
+def setup_scene(game, scene):
+    """ Puts the game into the state for a scene. Returns a function run before every frame, if the scene needs one. """
+
+    game.close_infobox()
+    state = game.colony.state
+
+    if scene == "idle":
+        return None
+
+    if scene == "full_field":
+        state.mines = 16
+        state.people = 16 * 8
+        return None
+
+    if scene == "huge_field":
+        # Thousands of mines and houses, zoomed all the way out so the most chunks are on screen
+        game.colony.max_mines = 5000
+        state.mines = 5000
+        state.people = 5000 * 8
+        for field in (game.mine_field, game.house_field):
+            field.zoom_by(len(field.ZOOM_LEVELS), 5000)
+            field.scroll_by(40, 5000)
+        return None
+
+    if scene == "infobox_zoom":
+        game.current_infobox = 0
+        infobox = game.infoboxes[0]
+        infobox.newly_opened = False
+
+        def hold_mid_zoom():
+            # Keep the ZoomAnimation on its middle frame for the whole run
+            infobox.animation.start()
+            infobox.animation.seek(0.5)
+
+        return hold_mid_zoom
+
+    if scene == "dial":
+        # The hand swings from one end of the dial to the other and back, so it moves every frame
+        dial = game.satisfaction_dial
+
+        def swing():
+            if dial.hand_angle == dial.target_angle:
+                dial.set_target(0.6 if dial.target_angle < 0 else 1.2)
+
+        return swing
+
+    if scene == "full_redraw":
+        # The whole screen repainted and presented every frame, the worst case, which render scale mode is for
+        state.mines = 16
+        state.people = 16 * 8
+        return game.renderer.invalidate
+
+    raise ValueError(f"Unknown scene {scene}")
+
+def run_frames(game, frames, before_frame):
+    for _ in range(frames):
+        if before_frame:
+            before_frame()
+        game.process_frame([])
+
+def measure(game, scene, frames):
+    before_frame = setup_scene(game, scene)
+
+    run_frames(game, 30, before_frame) # Warm up caches
+
+    start = time.perf_counter()
+    run_frames(game, frames, before_frame)
+    elapsed = time.perf_counter() - start
+
+    # Allocation pass, kept separate because tracemalloc slows everything down
+    alloc_frames = max(1, frames // 10)
+    tracemalloc.start()
+    total_peak = 0
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(alloc_frames):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run_frames(game, 1, before_frame)
+        _, peak = tracemalloc.get_traced_memory()
+        total_peak += peak - current
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    return {
+        "fps": frames / elapsed,
+        "alloc_kib_per_frame": total_peak / alloc_frames / 1024, # Peak Python memory allocated during a frame
+        "retained_blocks_per_frame": (blocks_after - blocks_before) / alloc_frames,
+    }
+
+def worker(scale, scenes, frames, render_scale = 1.0):
+    """ Runs inside the child process for one scaling factor, and render scale if the frame is drawn offscreen and scaled up. """
+
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SPACEMINES_SAVE"] = "" # Always a fresh colony, and no autosaving
+    os.environ["SPACEMINES_RESOLUTION"] = f"{round(2560 * scale)}x{round(1440 * scale)}"
+    os.environ["SPACEMINES_RENDER_SCALE"] = str(render_scale)
+
+    import game
+    game.frame_time = FRAME_TIME
+
+    results = {}
+    for scene in scenes:
+        results[f"{scene}@{scale}" + (f"r{render_scale}" if render_scale != 1 else "")] = measure(game, scene, frames)
+    return results
+
+###############
+##### Reporting
+
+def run_all(scales, scenes, frames, render_scales = (1.0,)):
+    results = {}
+    for scale in scales:
+        for render_scale in render_scales:
+            for scene in scenes: # One process per scene as well, so scenes cannot affect each other
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.render", "--worker", "--scale", str(scale), "--render-scale", str(render_scale), "--scenes", scene, "--frames", str(frames)],
+                    capture_output = True, text = True, check = True,
+                ).stdout
+                results.update(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+def compare(results, baseline):
+    print(f"{'scene':<22}{'fps':>10}{'baseline':>10}{'change':>11}{'KiB/frame':>11}{'baseline':>10}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base:
+            change = (result["fps"] - base["fps"]) / base["fps"] * 100
+            print(f"{key:<22}{result['fps']:>10.1f}{base['fps']:>10.1f}{change:>+9.1f}%{result['alloc_kib_per_frame']:>11.1f}{base['alloc_kib_per_frame']:>10.1f}")
+        else:
+            print(f"{key:<22}{result['fps']:>10.1f}{'-':>10}{'-':>11}{result['alloc_kib_per_frame']:>11.1f}{'-':>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Headless render benchmark")
+    parser.add_argument("--frames", type = int, default = 300)
+    parser.add_argument("--scales", type = float, nargs = "+", default = SCALING_FACTORS)
+    parser.add_argument("--scenes", nargs = "+", default = SCENES, choices = SCENES)
+    parser.add_argument("--render-scales", type = float, nargs = "+", default = (1.0,), help = "also run with the frame drawn at these fractions of native and scaled up")
+    parser.add_argument("--save-baseline", action = "store_true")
+    parser.add_argument("--worker", action = "store_true", help = argparse.SUPPRESS)
+    parser.add_argument("--scale", type = float, help = argparse.SUPPRESS)
+    parser.add_argument("--render-scale", type = float, default = 1.0, help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.scale, args.scenes, args.frames, args.render_scale)))
+        sys.exit()
+
+    results = run_all(args.scales, args.scenes, args.frames, args.render_scales)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as file:
+            baseline = json.load(file)
+
+    compare(results, baseline)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(results, file, indent = 4, sort_keys = True)
+        print(f"Saved baseline to {BASELINE_PATH}")
@@ -0,0 +1,61 @@
+""" Measures how long loading every game image takes with a cold and a warm ImageCache, and how long making the Images takes
+    when the asset registry leaves the loading until they are used.
+
+    Usage (from the repository root): python -m benchmarks.startup
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import classes
+from classes import *
+
+SCALING_FACTORS = (1.0, 0.75, 0.5)
+
+def create_all(game_res):
+    images = [Image(filepath, game_res) for filepath in glob.glob("images/*.png")]
+    for directory in ("images/miners", "images/houses", "images/acalendar"):
+        images.extend(AnimatedImage(directory, 100, game_res, AnimationClock()).frames)
+    return images
+
+def timed_load(game_res, lazy = False):
+    assets.clear() # Every run starts with nothing loaded
+    start = time.perf_counter()
+    images = create_all(game_res)
+    if not lazy:
+        for image in images:
+            image.image
+    return time.perf_counter() - start
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((256, 144))
+
+    cache_directory = tempfile.mkdtemp()
+    classes.image_cache.directory = cache_directory
+
+    try:
+        for scale in SCALING_FACTORS:
+            game_res = GameResolution((2560, 1440), (int(2560 * scale), int(1440 * scale)), Point(scale, scale))
+
+            classes.image_cache.enabled = False
+            uncached = timed_load(game_res)
+
+            classes.image_cache.enabled = True
+            cold = timed_load(game_res)
+            warm = min(timed_load(game_res) for _ in range(5))
+            lazy = min(timed_load(game_res, True) for _ in range(5))
+
+            print(f"scale {scale}: no cache {uncached * 1000:.1f}ms, cold {cold * 1000:.1f}ms, warm {warm * 1000:.1f}ms, lazy {lazy * 1000:.2f}ms")
+    finally:
+        shutil.rmtree(cache_directory)
+
+if __name__ == "__main__":
+    main()
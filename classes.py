@@ -2,6 +2,12 @@ import pygame
 from dataclasses import dataclass
 import math
 import glob
+import heapq
+import hashlib
+import os
+import struct
+import threading
+import time
 
 class Colours:
     RED = (255, 0, 0)
@@ -30,38 +36,133 @@ class Colours:
     LIGHT_GRAYBLUE = (97, 133, 145) #(185, 237, 234)
     BLUE = (121, 165, 189)
 
-@dataclass
+_NUMBERS = (int, float)
+
 class Point:
     """
-    This dataclass is used to store coordinates. These coordinates may represent the location of an object, a point relevant to an object,
+    This class is used to store coordinates. These coordinates may represent the location of an object, a point relevant to an object,
     or any other type of point. This reimplements operations like + - * / since one "position" object represents two numbers: an X and Y coordinate.
+
+    Points are slotted to keep them small and quick to create, since several are made every frame. The other operand of + - * / can be
+    another Point, an (x, y) tuple or, for * and /, a single number. The in-place forms (+= -= *= /=) change the Point itself instead of
+    making a new one. Points also behave like an (x, y) tuple: they can be unpacked, indexed and passed straight to pygame.
+    Use FrozenPoint for a Point that can never change, e.g. a shared constant or a dictionary key.
     """
 
-    x: int
-    y: int
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
 
+    # Point is checked first with "is", as that is the most common case and the cheapest check
     def __add__(self, other):
-        return Point(self.x + other.x, self.y + other.y)
+        if type(other) is Point or isinstance(other, Point):
+            return Point(self.x + other.x, self.y + other.y)
+        return Point(self.x + other[0], self.y + other[1])
     def __sub__(self, other):
-        return Point(self.x - other.x, self.y - other.y)
+        if type(other) is Point or isinstance(other, Point):
+            return Point(self.x - other.x, self.y - other.y)
+        return Point(self.x - other[0], self.y - other[1])
     def __mul__(self, scalar):
-        if isinstance(scalar, self.__class__):
+        if type(scalar) is Point or isinstance(scalar, Point):
             return Point(self.x * scalar.x, self.y * scalar.y)
-        elif isinstance(scalar, tuple):
-            return Point(self.x * scalar[0], self.y * scalar[1])
-        else:
+        elif isinstance(scalar, _NUMBERS):
             return Point(self.x * scalar, self.y * scalar)
+        else:
+            return Point(self.x * scalar[0], self.y * scalar[1])
     def __truediv__(self, scalar):
-        if isinstance(scalar, self.__class__):
+        if type(scalar) is Point or isinstance(scalar, Point):
             return Point(self.x / scalar.x, self.y / scalar.y)
-        elif isinstance(scalar, tuple):
+        elif isinstance(scalar, _NUMBERS):
+            return Point(self.x / scalar, self.y / scalar)
+        else:
             return Point(self.x / scalar[0], self.y / scalar[1])
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def __iadd__(self, other):
+        if type(other) is Point or isinstance(other, Point):
+            self.x += other.x
+            self.y += other.y
         else:
-            return Point(self.x / scalar, self.y / scalar)
+            self.x += other[0]
+            self.y += other[1]
+        return self
+    def __isub__(self, other):
+        if type(other) is Point or isinstance(other, Point):
+            self.x -= other.x
+            self.y -= other.y
+        else:
+            self.x -= other[0]
+            self.y -= other[1]
+        return self
+    def __imul__(self, scalar):
+        if type(scalar) is Point or isinstance(scalar, Point):
+            self.x *= scalar.x
+            self.y *= scalar.y
+        elif isinstance(scalar, _NUMBERS):
+            self.x *= scalar
+            self.y *= scalar
+        else:
+            self.x *= scalar[0]
+            self.y *= scalar[1]
+        return self
+    def __itruediv__(self, scalar):
+        if type(scalar) is Point or isinstance(scalar, Point):
+            self.x /= scalar.x
+            self.y /= scalar.y
+        elif isinstance(scalar, _NUMBERS):
+            self.x /= scalar
+            self.y /= scalar
+        else:
+            self.x /= scalar[0]
+            self.y /= scalar[1]
+        return self
+
+    def __neg__(self):
+        return Point(-self.x, -self.y)
+
+    # Tuple interface
     def __len__(self):
-        return int(math.sqrt(self.x ** 2 + self.y ** 2))
+        return 2
+    def __iter__(self):
+        yield self.x
+        yield self.y
+    def __getitem__(self, index):
+        return (self.x, self.y)[index]
+
     def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
+        if isinstance(other, Point):
+            return self.x == other.x and self.y == other.y
+        if isinstance(other, tuple):
+            return len(other) == 2 and self.x == other[0] and self.y == other[1]
+        return NotImplemented
+
+    __hash__ = None # Mutable, so not hashable. FrozenPoint is
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(x={self.x!r}, y={self.y!r})"
+
+    def __reduce__(self):
+        return (self.__class__, (self.x, self.y))
+
+    def set(self, x, y):
+        """ Moves the Point without making a new one. """
+        self.x = x
+        self.y = y
+        return self
+
+    def copy(self):
+        return Point(self.x, self.y)
+
+    def frozen(self):
+        return FrozenPoint(self.x, self.y)
+
+    def magnitude(self):
+        """ Distance from (0, 0). This used to be what len() returned. """
+        return math.hypot(self.x, self.y)
 
     def tuple(self):
         return (self.x, self.y)
@@ -74,22 +175,207 @@ class Point:
     y_max_limit: int = None
     """
 
+class FrozenPoint(Point):
+    """ A Point that cannot be changed, and so can be hashed. Arithmetic still works and returns ordinary Points, while the in-place
+        operators return a new FrozenPoint rather than changing this one. """
+
+    __slots__ = ()
+
+    def __init__(self, x, y):
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"FrozenPoint is immutable, cannot set {name}")
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __iadd__(self, other):
+        return (self + other).frozen()
+    def __isub__(self, other):
+        return (self - other).frozen()
+    def __imul__(self, scalar):
+        return (self * scalar).frozen()
+    def __itruediv__(self, scalar):
+        return (self / scalar).frozen()
+
+    def set(self, x, y):
+        raise AttributeError("FrozenPoint is immutable, use Point.copy() for a changeable copy")
+
+    def frozen(self):
+        return self
+
 @dataclass
 class GameResolution:
     native_res: tuple
-    current_res: tuple
+    current_res: tuple # What the game is drawn at
     scaling_factor: Point
+    window_res: tuple = None # Size of the window, if the frame is drawn offscreen at current_res and scaled up to it (render scale mode)
+
+class ImageCache:
+    """ On-disk cache of images that have already been decoded and scaled for a particular scaling factor.
+
+        Entries are keyed by a hash of the source file and the scaling factor, and stored as a small header followed by raw RGBA pixels,
+        which pygame.image.frombuffer can wrap without decoding. Only the first launch at a new resolution pays for PNG decoding and scaling. """
+
+    HEADER = struct.Struct("<4sHII") # Magic, format version, width, height
+    MAGIC = b"SMIC"
+    VERSION = 1
+
+    def __init__(self, directory = ".cache/images"):
+
+        self.directory = directory
+        self.enabled = True
+
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, source_bytes, scaling_factor: Point):
+        digest = hashlib.sha1(source_bytes).hexdigest()
+        return os.path.join(self.directory, f"{digest}_{scaling_factor.x:.6f}x{scaling_factor.y:.6f}.raw")
+
+    def read(self, path):
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        if len(data) < self.HEADER.size:
+            return None
+        magic, version, width, height = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION or len(data) != self.HEADER.size + width * height * 4:
+            return None
+
+        pixels = memoryview(data)[self.HEADER.size:]
+        return pygame.image.frombuffer(pixels, (width, height), "RGBA").convert_alpha() # convert_alpha copies, so the buffer can be released
+
+    def write(self, path, surface):
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(self.HEADER.pack(self.MAGIC, self.VERSION, surface.get_width(), surface.get_height()))
+                file.write(pygame.image.tobytes(surface, "RGBA"))
+            os.replace(temp_path, path) # Another copy of the game starting at the same time never sees a half-written file
+        except OSError:
+            pass # The cache is only an optimisation
+
+    def load(self, filepath, scaling_factor: Point):
+        """ Returns the image at filepath, converted and scaled by scaling_factor. """
+
+        with open(filepath, "rb") as file:
+            source_bytes = file.read()
+
+        path = self.entry_path(source_bytes, scaling_factor) if self.enabled else None
+        if path:
+            surface = self.read(path)
+            if surface is not None:
+                self.hits += 1
+                return surface
+
+        self.misses += 1
+        surface = pygame.image.load(filepath).convert_alpha()
+
+        if(not scaling_factor == Point(1, 1)):
+            # Use smoothscale if this gets too ugly
+            surface = pygame.transform.scale(surface, (Point(surface.get_width(), surface.get_height()) * scaling_factor).tuple())
+
+        if path:
+            self.write(path, surface)
+
+        return surface
+
+image_cache = ImageCache()
+
+class AssetRegistry:
+    """ Hands out one shared copy of each image per (filepath, scaling factor), however many Images use it.
+
+        Images only register their file when they are made, and the pixels are loaded the first time one of them is drawn or
+        measured, so nothing is loaded that is never shown. preload() loads everything registered but not yet used on a background
+        thread, so it is ready before it is needed. Each entry is (image, source, area), the same as an Image's attributes,
+        which lets Images made after a SpriteAtlas was packed pick up the atlas region too. """
+
+    def __init__(self):
+
+        self.registered = {} # key -> (filepath, scaling factor)
+        self.entries = {} # key -> (image, source, area)
+        self.lock = threading.Lock() # Held while loading, so the main thread and the preload thread never load the same file twice
+
+        self.hits = 0
+        self.loads = 0
+        self.load_time = 0 # Seconds spent loading, on either thread
+        self.preload_thread = None
+
+    def register(self, filepath, scaling_factor: Point):
+        key = (filepath, scaling_factor.x, scaling_factor.y)
+        self.registered.setdefault(key, (filepath, scaling_factor))
+        return key
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None: # Unless the preload thread loaded it while this thread waited for the lock
+                start = time.perf_counter()
+                image = image_cache.load(*self.registered[key])
+                entry = self.entries[key] = (image, image, None)
+                self.loads += 1
+                self.load_time += time.perf_counter() - start
+        return entry
+
+    def adopt(self, key, image, source, area):
+        """ Replaces an entry, e.g. with its region of a SpriteAtlas page, so the separate surface can be freed. """
+        self.entries[key] = (image, source, area)
+
+    def preload(self):
+        """ Starts loading everything registered but not yet loaded on a background thread. Does nothing if already started. """
+        if self.preload_thread is None:
+            self.preload_thread = threading.Thread(target = self.load_all, name = "preload", daemon = True)
+            self.preload_thread.start()
+
+    def load_all(self):
+        for key in list(self.registered):
+            self.get(key)
+
+    def pending(self):
+        return len(self.registered) - len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def memory_usage(self):
+        """ Bytes of pixels held, counting each surface once however many entries share it. """
+        surfaces = {id(source): source for _, source, _ in self.entries.values()}
+        return sum(surface.get_width() * surface.get_height() * surface.get_bytesize() for surface in surfaces.values())
+
+    def stats(self):
+        return {"assets": f"{len(self.entries)}/{len(self.registered)}", "asset MB": f"{self.memory_usage() / 2 ** 20:.1f}", "load ms": f"{self.load_time * 1000:.0f}"}
+
+assets = AssetRegistry()
 
 class Image:
     def __init__(self, filepath, game_res):
 
+        self.filepath = filepath
         self.scaling_factor = game_res.scaling_factor
+        self.key = assets.register(filepath, self.scaling_factor)
 
-        self.image = pygame.image.load(filepath).convert_alpha()
+        # image, source and area come from the asset registry the first time any of them is used, see __getattr__.
+        # image is the scaled surface. source and area are what is actually blitted: normally the image itself and None,
+        # but once packed into a SpriteAtlas they are the atlas page and the area within it
 
-        if(not self.scaling_factor == Point(1, 1)):
-            # Use smoothscale if this gets too ugly
-            self.image = pygame.transform.scale(self.image, (Point(self.image.get_width(), self.image.get_height()) * self.scaling_factor).tuple())
+    def __getattr__(self, name):
+        # Only called while an attribute is missing, so once loaded these are plain attribute lookups again
+        if name in ("image", "source", "area") and "key" in self.__dict__:
+            self.image, self.source, self.area = assets.get(self.key)
+            return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
 
     def return_scaled_image(self):
         return self.image
@@ -98,42 +384,235 @@ class Image:
         return self.image.get_rect()
 
     def render(self, screen, pos: Point, centered = False):
-        render_pos = pos * self.scaling_factor # Multiply current position by scaling factor to obtain final position
+        # Multiply current position by scaling factor to obtain final position. Done on the numbers directly, as this runs for every sprite every frame
+        x = pos.x * self.scaling_factor.x
+        y = pos.y * self.scaling_factor.y
         if centered:
-            render_pos -= Point(self.image.get_width() / 2, self.image.get_height() / 2)
-        screen.blit(self.image, render_pos.tuple())
+            x -= self.image.get_width() / 2
+            y -= self.image.get_height() / 2
+        screen.blit(self.source, (x, y), self.area)
+
+
+class AnimationClock:
+    """ Drives every AnimatedImage from one advance() call per frame.
+
+        Each animation is kept in a heap ordered by the time of its next frame change, so advance() only touches the animations
+        that are actually due and does nothing for the rest. Frame numbers are worked out from the time since the animation started
+        rather than counted one change at a time, so they stay correct when frames are dropped or the game sleeps between frames. """
 
+    def __init__(self):
+
+        self.now = 0 # Milliseconds of animation time so far
+        self.heap = [] # (time of next change, sequence number, AnimatedImage)
+        self.sequence = 0 # Tie breaker, so AnimatedImages themselves are never compared
+
+    def add(self, animation):
+        animation.start_time = self.now
+        self.schedule(animation, self.now + animation.frame_length)
+
+    def remove(self, animation):
+        animation.next_change = None # Its heap entry is dropped when it comes up
+
+    def schedule(self, animation, time):
+        animation.next_change = time
+        self.sequence += 1
+        heapq.heappush(self.heap, (time, self.sequence, animation))
+
+    def advance(self, delta):
+        self.now += delta
+
+        heap = self.heap
+        while heap and heap[0][0] <= self.now:
+            time, _, animation = heapq.heappop(heap)
+            if animation.next_change != time: # Removed, or rescheduled since this entry was added
+                continue
+
+            steps = int((self.now - animation.start_time) // animation.frame_length)
+            animation.update_frame(steps)
+            self.schedule(animation, animation.start_time + (steps + 1) * animation.frame_length)
+
+    def next_deadline(self):
+        """ Milliseconds until the next frame change of any animation, or None if there are none. """
+        return max(0, self.heap[0][0] - self.now) if self.heap else None
+
+# Every AnimatedImage registers here unless given its own clock, and the main loop advances it once per frame
+animation_clock = AnimationClock()
 
 class AnimatedImage():
-    def __init__(self, image_directory, frame_length, game_res):
+    def __init__(self, image_directory, frame_length, game_res, clock: AnimationClock = None):
 
-        self.frames = []
+        frames = []
         for filepath in glob.glob(f"{image_directory}/*.png"):
-            self.frames.append(Image(filepath, game_res))
+            frames.append(Image(filepath, game_res))
+
+        self.init_frames(frames, frame_length, clock)
+
+    @classmethod
+    def from_frames(cls, frames, frame_length, clock: AnimationClock = None):
+        """ An animation over frames that are already loaded, such as another AnimatedImage's. """
+        animated_image = cls.__new__(cls)
+        animated_image.init_frames(list(frames), frame_length, clock)
+        return animated_image
+
+    def init_frames(self, frames, frame_length, clock):
 
+        self.frames = frames
         self.num_frames = len(self.frames)
         self.current_frame = 0
+        self.frame_offset = 0 # Frames skipped by hand with next_frame(), on top of those from elapsed time
 
         self.frame_length = frame_length
-        self.time_until_next = self.frame_length
         self.pause = False
 
+        self.start_time = 0
+        self.next_change = None # Set by the clock
+        self.clock = clock or animation_clock
+        if self.num_frames > 1:
+            self.clock.add(self)
+
     def get_rect(self):
-        self.frames[self.current_frame].get_rect()
+        return self.frames[self.current_frame].get_rect()
 
     def next_frame(self):
         if not self.pause:
-            if self.current_frame >= self.num_frames - 1:
-                self.current_frame = 0
-            else:
-                self.current_frame += 1
+            self.frame_offset += 1
+            self.current_frame = (self.current_frame + 1) % self.num_frames
 
-    def tick(self, delta):
-        self.time_until_next -= delta
+    def update_frame(self, steps):
+        """ Called by the clock when a frame change is due, with the number of frame lengths since the animation started. """
+        if self.pause:
+            self.frame_offset = self.current_frame - steps # Hold the current frame, and carry on from it once unpaused
+        else:
+            self.current_frame = (steps + self.frame_offset) % self.num_frames
 
-        if(self.time_until_next <= 0):
-            self.next_frame()
-            self.time_until_next = self.frame_length
+    def next_deadline(self):
+        """ Milliseconds until the next frame change, or None if it will not change. """
+        if self.pause or self.next_change is None:
+            return None
+        return max(0, self.next_change - self.clock.now)
 
     def render(self, screen, pos: Point, centered = False):
-        self.frames[self.current_frame].render(screen, pos, centered)
\ No newline at end of file
+        self.frames[self.current_frame].render(screen, pos, centered)
+
+class SpriteAtlas:
+    """ Packs many small images into a few large surfaces ("pages") so there are fewer surfaces to keep in memory,
+        and so sprites that share a page can be drawn together with one Surface.blits() call.
+
+        Images are packed with a simple shelf packer, tallest first. Every packed Image then blits a sub-rect of its page
+        instead of its own surface. Images loaded from the same file at the same scale share one region, so duplicate copies
+        (e.g. the calendar frames inside Buttons) are only stored once. """
+
+    def __init__(self, page_size = (2048, 2048), padding = 1):
+
+        self.page_size = page_size
+        self.padding = padding # Gap between sprites, stops neighbours bleeding into each other when scaled
+
+        self.pages = []
+        self.index = {} # (filepath, width, height) -> (page number, Rect)
+
+    def collect(self, drawables):
+        """ Flattens Images, AnimatedImages and anything with an images list (Buttons) into a list of Images. """
+
+        images = []
+        for drawable in drawables:
+            if isinstance(drawable, Image):
+                images.append(drawable)
+            elif isinstance(drawable, AnimatedImage):
+                images.extend(drawable.frames)
+            elif getattr(drawable, "images", None):
+                images.extend(self.collect(drawable.images))
+        return images
+
+    def pack(self, *drawables):
+        images = self.collect(drawables)
+
+        # One region per distinct source image
+        unique = {}
+        for image in images:
+            key = (image.filepath, image.image.get_width(), image.image.get_height())
+            if key not in self.index and key not in unique:
+                unique[key] = image.image
+
+        shelves = self.place(sorted(unique.items(), key = lambda item: -item[1].get_height()))
+
+        for page_number, placements in shelves.items():
+            used_size = (max(rect.right for _, _, rect in placements), max(rect.bottom for _, _, rect in placements)) # Trim unused space
+            page = pygame.Surface(used_size, pygame.SRCALPHA).convert_alpha()
+            page.fill((0, 0, 0, 0))
+            for key, surface, rect in placements:
+                page.blit(surface, rect)
+                self.index[key] = (len(self.pages), rect)
+            self.pages.append(page)
+
+        for image in images:
+            page_number, rect = self.index[(image.filepath, image.image.get_width(), image.image.get_height())]
+            image.source = self.pages[page_number]
+            image.area = rect
+            image.image = image.source.subsurface(rect) # Shares pixels with the page, so the separate surface can be freed
+            assets.adopt(image.key, image.image, image.source, image.area)
+
+    def place(self, items):
+        """ Shelf packing: fill rows left to right, start a new row when one is full and a new page when the rows run out. """
+
+        shelves = {}
+        page, x, y, shelf_height = 0, 0, 0, 0
+        page_width, page_height = self.page_size
+
+        for key, surface in items:
+            width, height = surface.get_size()
+            if width > page_width or height > page_height:
+                raise ValueError(f"{key[0]} ({width}x{height}) does not fit on a {page_width}x{page_height} atlas page")
+
+            if x + width > page_width: # New shelf
+                x, y, shelf_height = 0, y + shelf_height + self.padding, 0
+            if y + height > page_height: # New page
+                page, x, y, shelf_height = page + 1, 0, 0, 0
+
+            shelves.setdefault(page, []).append((key, surface, pygame.Rect(x, y, width, height)))
+
+            x += width + self.padding
+            shelf_height = max(shelf_height, height)
+
+        return shelves
+
+    def memory_usage(self):
+        return sum(page.get_width() * page.get_height() * page.get_bytesize() for page in self.pages)
+
+class SpriteBatch:
+    """ Draws many copies of sprites at fixed positions with a single Surface.blits() call.
+
+        Each group given to add() is one Image or AnimatedImage and a list of positions. The positions are scaled once, exactly as
+        Image.render() would scale them, and the resulting (source, dest, area) entries are stored for every animation frame.
+        queue() then only has to pick the entries for the current frame, and draw() passes everything queued to blits() at once.
+        Groups should be added after any SpriteAtlas.pack(), as packing changes what each Image blits from.
+
+        A batch has a single queue, so each surface it draws onto (a static layer, the frame itself) should get its own batch.
+        Otherwise sprites queued for one could end up drawn onto the other. """
+
+    def __init__(self):
+
+        self.groups = {} # name -> (drawable, entries per frame)
+        self.queued = []
+
+    def add(self, name, drawable, positions, centered = False):
+        frames = drawable.frames if isinstance(drawable, AnimatedImage) else [drawable]
+
+        entries = []
+        for image in frames:
+            offset_x = image.image.get_width() / 2 if centered else 0
+            offset_y = image.image.get_height() / 2 if centered else 0
+            area = tuple(image.area) if image.area is not None else None
+            entries.append([(image.source, (pos.x * image.scaling_factor.x - offset_x, pos.y * image.scaling_factor.y - offset_y), area) for pos in positions])
+
+        self.groups[name] = (drawable, entries)
+
+    def queue(self, name, count = None):
+        """ Queues the first count positions of a group (all of them if count is None) at the drawable's current frame. """
+        drawable, entries = self.groups[name]
+        frame = drawable.current_frame if isinstance(drawable, AnimatedImage) else 0
+        self.queued.extend(entries[frame][:count])
+
+    def draw(self, screen):
+        if self.queued:
+            screen.blits(self.queued, False)
+            self.queued.clear()
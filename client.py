@@ -0,0 +1,101 @@
+""" Blocking client for the game server, and a colony that lives on the server.
+
+    RemoteColony has the same interface as simulation.Colony (state, seed, max_mines and the action methods), so the game can play
+    a colony hosted by server.py without any other changes: every action is one request, and the state the server sends back
+    replaces the local copy. The game only ever reads the state, all the rules and randomness stay on the server.
+
+    Requests block until the reply arrives or the timeout passes. The game makes them from its main loop, so a slow server freezes the
+    window for that long. """
+
+import socket
+
+import simulation
+from simulation import Action
+from server import LENGTH, MAX_MESSAGE, ProtocolError, pack_message, parse_address, unpack_body
+
+class RemoteError(Exception):
+    """ The server turned down a request. """
+
+class Client:
+
+    def __init__(self, address, timeout = 5.0):
+
+        kind, location = parse_address(address)
+        if kind == "unix":
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(location)
+        else:
+            self.socket = socket.create_connection(location, timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.next_id = 1
+
+    def receive_exactly(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Server closed the connection")
+            data += chunk
+        return data
+
+    def request(self, op, **fields):
+        """ Sends one request and waits for its response. Raises RemoteError if the server answers with an error. """
+
+        request_id = self.next_id
+        self.next_id += 1
+        self.socket.sendall(pack_message({"op": op, "id": request_id, **fields}))
+
+        length, = LENGTH.unpack(self.receive_exactly(LENGTH.size))
+        if length > MAX_MESSAGE:
+            raise ProtocolError(f"Message of {length} bytes is larger than the {MAX_MESSAGE} byte limit")
+        response = unpack_body(self.receive_exactly(length))
+
+        if not response.get("ok"):
+            raise RemoteError(response.get("error", "Request failed"))
+        if response.get("id") != request_id:
+            raise ProtocolError(f"Response to request {response.get('id')} arrived while waiting for {request_id}")
+        return response
+
+    def close(self):
+        self.socket.close()
+
+class RemoteColony:
+    """ Stands in for simulation.Colony. Joins the session with the given token, or starts a new one. """
+
+    def __init__(self, client: Client, session = None, seed = None, name = None):
+
+        self.client = client
+
+        if session is None:
+            response = client.request("new", seed = seed, name = name)
+            session = response["session"]
+        else:
+            response = client.request("join", session = session)
+
+        self.session = session
+        self.seed = seed # The server keeps its own seeds to itself
+        self.number = response["number"]
+        self.max_mines = response["max_mines"]
+        self.state = simulation.ColonyState(**response["state"])
+
+    def apply(self, action: Action):
+        response = self.client.request("act", session = self.session, action = action.name)
+        self.state = simulation.ColonyState(**response["state"])
+        return response["done"]
+
+    def next_year(self):
+        return self.apply(Action.NEXT_YEAR)
+
+    def sell_ore(self):
+        return self.apply(Action.SELL_ORE)
+
+    def buy_mine(self):
+        return self.apply(Action.BUY_MINE)
+
+    def sell_mine(self):
+        return self.apply(Action.SELL_MINE)
+
+    def buy_food(self):
+        return self.apply(Action.BUY_FOOD)
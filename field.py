@@ -0,0 +1,211 @@
+""" The mine and house fields.
+
+    A field lays out any number of copies of one animated sprite on a procedural grid. Slots are grouped into chunks of rows x columns
+    (4 x 4 by default, which is the original 16 slot field), and each chunk is drawn once into its own surface and cached. A chunk only
+    depends on how many of its slots are filled, the sprite's animation frame and the zoom level, so every full chunk shares one cached
+    surface, and a chunk is only drawn again when one of those changes.
+
+    Only the chunks that overlap the field's viewport are blitted, clipped to the viewport, so frame time depends on the size of the
+    viewport rather than the number of sprites. Once the field is scrolled or zoomed out, chunks are also clipped to the panel the field
+    sits in, so they never spill onto the background around it. The resulting blits are kept too, and only worked out again when the count, scroll,
+    zoom or animation frame changes, so most frames just hand the same list to one blits() call. The mouse wheel scrolls the field sideways and Ctrl + mouse wheel zooms out, which
+    stacks more rows of chunks into the same viewport. """
+
+import math
+from collections import OrderedDict
+
+import pygame
+from pygame.locals import *
+
+from classes import *
+
+class FieldLayout:
+    """ Where each slot goes, in native (2560 x 1440) pixels. Chunks fill column by column, and so do the slots within a chunk. """
+
+    def __init__(self, spacing: Point, rows = 4, columns = 4):
+
+        self.spacing = spacing # Distance between neighbouring slots
+        self.rows = rows
+        self.columns = columns
+
+    @property
+    def per_chunk(self):
+        return self.rows * self.columns
+
+    @property
+    def chunk_size(self):
+        """ Distance between neighbouring chunks. """
+        return Point(self.columns * self.spacing.x, self.rows * self.spacing.y)
+
+    def chunk_count(self, count):
+        return math.ceil(count / self.per_chunk)
+
+    def slot_offset(self, slot):
+        """ Position of a slot within its chunk. """
+        return Point((slot // self.rows) * self.spacing.x, (slot % self.rows) * self.spacing.y)
+
+class Field:
+
+    ZOOM_LEVELS = (1, 0.5, 0.25, 0.125) # Each level stacks twice as many rows of chunks into the viewport
+
+    def __init__(self, sprite: AnimatedImage, origin: Point, layout: FieldLayout, game_res: GameResolution, panel: pygame.Rect = None, cache_size = 32):
+
+        self.sprite = sprite
+        self.layout = layout
+        self.game_res = game_res
+
+        sprite_size = Point(*sprite.get_rect().size) / game_res.scaling_factor # Back to native pixels
+        self.chunk_extent = Point(layout.chunk_size.x - layout.spacing.x + sprite_size.x, layout.chunk_size.y - layout.spacing.y + sprite_size.y) # Sprites stick out past the chunk's own slots
+
+        # The viewport is exactly one chunk at full zoom, so a field of up to one chunk looks the same as before scrolling was added
+        origin = origin * game_res.scaling_factor
+        extent = self.chunk_extent * game_res.scaling_factor
+        self.viewport = pygame.Rect(int(origin.x), int(origin.y), int(extent.x), int(extent.y))
+        self.panel = panel # On screen, like the viewport
+
+        self.scroll = 0 # Native pixels
+        self.zoom_index = 0
+
+        self.cache = OrderedDict() # (filled slots, frame, zoom) -> Surface, least recently used first
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+        self.blits_key = None # (count, scroll, zoom, frame) that blits was worked out for
+        self.blits = [] # (surface, dest, area) of every visible chunk
+
+    @property
+    def zoom(self):
+        return self.ZOOM_LEVELS[self.zoom_index]
+
+    @property
+    def band(self):
+        """ Rows of chunks in the viewport at the current zoom. """
+        return max(1, int(1 / self.zoom))
+
+    ### Chunk surfaces
+
+    def build_chunk(self, filled, frame, zoom):
+        if zoom != 1:
+            full_size = self.chunk(filled, frame, 1)
+            return pygame.transform.smoothscale(full_size, (max(1, round(full_size.get_width() * zoom)), max(1, round(full_size.get_height() * zoom))))
+
+        surface = pygame.Surface(self.viewport.size, pygame.SRCALPHA).convert_alpha()
+        surface.fill((0, 0, 0, 0))
+
+        image = self.sprite.frames[frame].image
+        scaling_factor = self.game_res.scaling_factor
+        surface.blits([(image, (self.layout.slot_offset(slot) * scaling_factor).tuple()) for slot in range(filled)], False)
+        return surface
+
+    def chunk(self, filled, frame, zoom):
+        key = (filled, frame, zoom)
+        surface = self.cache.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.cache[key] = self.build_chunk(filled, frame, zoom)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last = False)
+        return surface
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.blits_key = None
+
+    ### Scrolling and zooming
+
+    def pitch(self):
+        """ On-screen distance between neighbouring chunks at the current zoom. """
+        chunk_size = self.layout.chunk_size * self.game_res.scaling_factor
+        chunk_size *= self.zoom
+        return chunk_size
+
+    def max_scroll(self, count):
+        columns = math.ceil(self.layout.chunk_count(count) / self.band)
+        content_width = max(0, columns - 1) * self.layout.chunk_size.x + self.chunk_extent.x
+        return max(0, content_width - self.chunk_extent.x / self.zoom)
+
+    def scroll_by(self, slots, count):
+        self.scroll = min(max(0, self.scroll + slots * self.layout.spacing.x / self.zoom), self.max_scroll(count))
+
+    def zoom_by(self, steps, count):
+        self.zoom_index = min(max(0, self.zoom_index + steps), len(self.ZOOM_LEVELS) - 1)
+        self.scroll = min(self.scroll, self.max_scroll(count))
+
+    def handle_event(self, event, count, mouse_pos = None):
+        """ Scrolls or zooms if event is a mouse wheel movement over the viewport. Returns whether it was.
+            mouse_pos is the cursor's position on the screen, if that is not where pygame reports it (render scale mode). """
+
+        if event.type != MOUSEWHEEL or not self.viewport.collidepoint(mouse_pos or pygame.mouse.get_pos()):
+            return False
+
+        if pygame.key.get_mods() & KMOD_CTRL:
+            self.zoom_by(-event.y, count)
+        else:
+            self.scroll_by(event.x - event.y, count)
+        return True
+
+    ### Rendering
+
+    def visible_chunks(self, count):
+        """ (chunk number, on-screen x, on-screen y) of every chunk that overlaps the viewport. """
+
+        chunks = self.layout.chunk_count(count)
+        if not chunks:
+            return []
+
+        pitch = self.pitch()
+        band = self.band
+        offset = self.scroll * self.game_res.scaling_factor.x * self.zoom
+        surface_width = self.viewport.width * self.zoom
+
+        first_column = max(0, math.floor((offset - surface_width) / pitch.x) + 1)
+        last_column = min(math.ceil(chunks / band) - 1, math.floor((offset + self.viewport.width) / pitch.x))
+
+        visible = []
+        for column in range(first_column, last_column + 1):
+            for row in range(band):
+                number = column * band + row
+                if number >= chunks:
+                    break
+                visible.append((number, self.viewport.x + column * pitch.x - offset, self.viewport.y + row * pitch.y))
+        return visible
+
+    def clip_rect(self):
+        """ Where chunks may be drawn. At rest the field shows exactly its first chunk, whose sprites stick out of the panel a little
+            as they always have. Anything scrolled or zoomed out is kept inside the panel. """
+        if self.panel is None or (self.scroll == 0 and self.zoom_index == 0):
+            return self.viewport
+        return self.viewport.clip(self.panel)
+
+    def visible_blits(self, count):
+        """ (surface, dest, area) for every chunk that overlaps the viewport, clipped to clip_rect(). """
+
+        key = (count, self.scroll, self.zoom_index, self.sprite.current_frame)
+        if key == self.blits_key:
+            return self.blits
+
+        frame = self.sprite.current_frame
+        zoom = self.zoom
+        per_chunk = self.layout.per_chunk
+        clip = self.clip_rect()
+
+        blits = []
+        for number, x, y in self.visible_chunks(count):
+            surface = self.chunk(min(per_chunk, count - number * per_chunk), frame, zoom)
+
+            rect = pygame.Rect(int(x), int(y), surface.get_width(), surface.get_height())
+            visible_rect = rect.clip(clip)
+            if visible_rect.width and visible_rect.height:
+                blits.append((surface, visible_rect.topleft, tuple(visible_rect.move(-rect.x, -rect.y))))
+
+        self.blits_key = key
+        self.blits = blits
+        return blits
+
+    def render(self, screen, count):
+        screen.blits(self.visible_blits(count), False)
@@ -8,20 +8,31 @@
 import pygame
 from pygame.locals import *
 
+import argparse
 import ctypes
 import sys
+import time
 import random
 import math
 import os
-from dataclasses import dataclass
 
 # Initialise
-ctypes.windll.user32.SetProcessDPIAware()
+if sys.platform == "win32":
+    ctypes.windll.user32.SetProcessDPIAware()
 pygame.init()
 
 # Import custom modules
 from classes import *
 import ui
+import simulation
+import render
+import profiler
+import tween
+import pacing
+import field
+import savegame
+import replay
+import client
 
 ###############
 ##### Functions
@@ -40,7 +51,9 @@ def setup():
             fullscreen_res = (display_info.current_w, round(display_info.current_w / 1.77778)) # Potentially round the y value up
             screen = pygame.display.set_mode(fullscreen_res, pygame.FULLSCREEN|pygame.SCALED)
     else:
-        screen = pygame.display.set_mode((2560, 1440))
+        # Windowed size can be overridden with e.g. SPACEMINES_RESOLUTION=1920x1080 (used by the benchmarks)
+        resolution = os.environ.get("SPACEMINES_RESOLUTION", "2560x1440")
+        screen = pygame.display.set_mode(tuple(int(value) for value in resolution.lower().split("x")))
 
     return screen
 
@@ -50,89 +63,125 @@ def scale_rect(rect: pygame.Rect, game_res):
 ###############
 ##### Variables
 
-screen = setup()
-clock = pygame.time.Clock()
+window = setup()
+
+# SPACEMINES_RENDER_SCALE=0.5 draws the game offscreen at that fraction of the native 2560 x 1440 and scales each frame up to the window
+# in one pass, trading sharpness for a quarter of the filling and blitting. Other fractions work too, but scaling up by a whole number
+# is much the cheapest: at 0.75 the upscale can cost more than it saves. SPACEMINES_RENDER_SMOOTH=1 filters the upscale
+render_scale = float(os.environ.get("SPACEMINES_RENDER_SCALE", "1"))
+internal_res = (min(window.get_width(), round(2560 * render_scale)), min(window.get_height(), round(1440 * render_scale)))
+if internal_res != window.get_size():
+    screen = pygame.Surface(internal_res).convert()
+    display = render.Upscaler(window, screen, smooth = os.environ.get("SPACEMINES_RENDER_SMOOTH", "0") != "0")
+else:
+    screen = window
+    display = pygame.display
+
+# Frame cap (0 for uncapped) and idle mode can be set with SPACEMINES_FPS and SPACEMINES_IDLE=0, e.g. to compare CPU usage
+frame_pacer = pacing.FramePacer(max_fps = int(os.environ.get("SPACEMINES_FPS", "60")), idle = os.environ.get("SPACEMINES_IDLE", "1") != "0")
 frame_time = 0
-game_res = GameResolution((2560, 1440), (screen.get_width(), screen.get_height()), Point(screen.get_width() / 2560, screen.get_height() / 1440))
-text = ui.Text(game_res.scaling_factor.y)
+game_res = GameResolution((2560, 1440), (screen.get_width(), screen.get_height()), Point(screen.get_width() / 2560, screen.get_height() / 1440), window.get_size())
+text = ui.Text(game_res.scaling_factor)
+renderer = render.DirtyRenderer(screen, display = display) # The game view is drawn through this so only changed regions are repainted
+frame_profiler = profiler.FrameProfiler() # F3 toggles timing + overlay, F4 exports the samples
 
 # Controls which screen is currently being displayed
 # 0 = Main Menu / 1 = Game
 view = 1
 update_zones = []
 
-@dataclass
-class GameData:
-    year = random.randint(2300, 2501)
+rendering = True # Off for fast replays
+quitting = False # Set by ESC or closing the window, the game quits once the current frame is finished
+recorder = None # replay.Recorder when running with --record
+fired_actions = [] # Actions run by the buttons clicked this frame, for the recorder
 
-    mines = random.randint(3, 8)
-    people = random.randint(40, 80)
-    money = random.randint(200, 500) * people
+# All game state and economy rules live in the simulation module, this file just drives it
+# SPACEMINES_MAX_MINES raises the mine limit for modded scenarios, the fields scroll to fit any number
+max_mines = int(os.environ.get("SPACEMINES_MAX_MINES", simulation.MAX_MINES))
 
-    food_price = random.randint(100, 300)
-    ore_price = random.randint(50, 80)
-    mine_price = random.randint(3000, 6000)
+# The colony is autosaved after every change and picked up again on the next launch. SPACEMINES_SAVE changes where, or turns it off if empty
+save_path = os.environ.get("SPACEMINES_SAVE", "saves/autosave.bin")
+colony = None
+if save_path and os.path.exists(save_path):
+    try:
+        colony = savegame.load(save_path)
+        colony.max_mines = max_mines
+    except (OSError, savegame.SaveError) as error:
+        print(f"Could not load {save_path}, starting a new colony: {error}")
+if colony is None:
+    colony = simulation.Colony(seed = random.randrange(2 ** 32), max_mines = max_mines)
 
-    ore_per_mine = random.randint(8, 20)
+autosaver = savegame.Autosaver(save_path) if save_path else None
 
-    stored_food = 100
-    stored_ore = random.randrange(40, 80)
-    satisfaction = 1
-
-    food_price_change = 0
-    ore_price_change = 0
-    mine_price_change = 0
-    ore_produced = 0
-
-satisfaction_dial = ui.SatisfactionDial(screen, game_res, GameData.satisfaction)
+satisfaction_dial = ui.SatisfactionDial(renderer, game_res, colony.state.satisfaction)
 
 ###############
 ##### Functions
 
+def colony_changed():
+    satisfaction_dial.set_target(colony.state.satisfaction) # Swings over the next few frames rather than jumping
+
+    # Only packs the state here, the autosave thread does the writing
+    if autosaver:
+        autosaver.submit(colony)
+
+def act(action):
+    """ Runs one of the colony's actions. A remote colony sends each one to the server and blocks this thread, and so the window,
+        until the reply arrives (up to the client's 5 second timeout). If the server goes away or turns the action down, the game
+        ends the same way as failing to join it. """
+    try:
+        return action()
+    except (OSError, client.RemoteError, client.ProtocolError) as error: # OSError covers timeouts and dropped connections
+        pygame.quit()
+        sys.exit(f"Lost the game on the server: {error}")
+
+def quit_game():
+    if autosaver:
+        autosaver.stop() # Writes out the latest state first
+    if recorder:
+        recorder.close(colony)
+    pygame.quit()
+    sys.exit()
+
+def mouse_position():
+    # Where the cursor is on screen, which in render scale mode is not the same as where it is on the window
+    return ui.map_mouse_position(pygame.mouse.get_pos(), game_res, game_res.current_res)
+
+def map_mouse_event(event):
+    if screen is window or not hasattr(event, "pos"):
+        return event
+    return pygame.event.Event(event.type, {**event.dict, "pos": ui.map_mouse_position(event.pos, game_res, game_res.current_res)})
+
 def close_infobox():
     global current_infobox
     current_infobox = -1
+    renderer.invalidate() # The dimmed background and infobox are still on screen, so everything needs to be redrawn
 
 def next_year():
     global current_infobox
     global infoboxes
-    global frame_time
-
-    GameData.year += 1
-
-    GameData.mine_price_change = (random.randint(55 if GameData.mine_price > 800 else 120, 145) / 100)
-    GameData.mine_price = int(GameData.mine_price * GameData.mine_price_change)
-
-    GameData.ore_price_change = (random.randint(75 if GameData.ore_price > 40 else 115, 125) / 100) 
-    GameData.ore_price = int(GameData.ore_price * GameData.ore_price_change)
 
-    GameData.food_price_change = (random.randint(80 if GameData.food_price > 40 else 110, 120) / 100) 
-    GameData.food_price = int(GameData.food_price * GameData.food_price_change)
-
-    GameData.ore_produced = GameData.ore_per_mine * (GameData.mines - random.randint(0, 1))
-    GameData.stored_ore += GameData.ore_produced
+    act(colony.next_year)
+    colony_changed()
 
     current_infobox = 0
-    infoboxes[current_infobox].open(frame_time)
+    infoboxes[current_infobox].open()
 
 def sell_ore():
-    GameData.money += GameData.stored_ore * GameData.ore_price
-    GameData.stored_ore = 0
+    if act(colony.sell_ore):
+        colony_changed()
 
 def buy_mine():
-    if GameData.money > GameData.mine_price and GameData.mines < 16:
-        GameData.money -= GameData.mine_price
-        GameData.mines += 1
+    if act(colony.buy_mine):
+        colony_changed()
 
 def sell_mine():
-    if GameData.mines > 0:
-        GameData.mines -= 1
-        GameData.money += GameData.mine_price
+    if act(colony.sell_mine):
+        colony_changed()
 
 def buy_food():
-    if GameData.money > GameData.food_price * 10:
-        GameData.stored_food += 10
-        GameData.money -= GameData.food_price * 10
+    if act(colony.buy_food):
+        colony_changed()
 
 ###############
 ##### GUI/Asset
@@ -144,9 +193,9 @@ infoboxes = [
     ui.InfoBox(Point(1200, 900), Point(1280, 720), game_res, {
         "colour": Colours.INFOBOX_GREY,
         "text": [], # this is set in update_yearly_report as these values need to be changed each year
-        "buttons": [ui.Button(ui.ButtonType.NORMAL, Point(600, 830), Point(160, 90), text.MED_BOLD.render("OK", True, Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [close_infobox])]
-    }, ui.ZoomAnimation(8, 0.05)),
-    ui.InfoBox(Point(800, 600), Point(1280, 720), game_res, {"colour": Colours.INFOBOX_GREY, "text": [(text.LARGE_BOLD.render("YOU LOST", True, Colours.WHITE), Point(600, 70), True)], "buttons": [ui.Button(ui.ButtonType.NORMAL, Point(400, 520), Point(120, 80), text.MED_BOLD.render("OK", True, Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [close_infobox])]}, ui.ZoomAnimation(8, 0.05))
+        "buttons": [ui.Button(ui.ButtonType.NORMAL, Point(600, 830), Point(160, 90), text.render(text.MED_BOLD, "OK", Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [close_infobox])]
+    }, ui.ZoomAnimation(150, "ease_out")),
+    ui.InfoBox(Point(800, 600), Point(1280, 720), game_res, {"colour": Colours.INFOBOX_GREY, "text": [(text.render(text.LARGE_BOLD, "YOU LOST", Colours.WHITE), Point(600, 70), True)], "buttons": [ui.Button(ui.ButtonType.NORMAL, Point(400, 520), Point(120, 80), text.render(text.MED_BOLD, "OK", Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [close_infobox])]}, ui.ZoomAnimation(150, "ease_out"))
 ]
 
 ##############
@@ -157,21 +206,21 @@ def update_yearly_report():
     
     """
     infoboxes[0].redefine_data("text", [
-        (text.LARGE_BOLD.render("THE YEARS MARCH ON", True, Colours.WHITE), Point(600, 70), True),
-        (text.SMALL_BOLD.render(f"It is now {GameData.year}", True, Colours.TEXT_SUBTITLE), Point(600, 120), True),
-        (text.MED_BOLD.render("Economic Report", True, Colours.TEXT_LIGHT), Point(300, 270), True),
-        (text.MED_BOLD.render("Colony Status", True, Colours.TEXT_LIGHT), Point(900, 270), True),
+        (text.render(text.LARGE_BOLD, "THE YEARS MARCH ON", Colours.WHITE), Point(600, 70), True),
+        (text.render(text.SMALL_BOLD, f"It is now {colony.state.year}", Colours.TEXT_SUBTITLE), Point(600, 120), True),
+        (text.render(text.MED_BOLD, "Economic Report", Colours.TEXT_LIGHT), Point(300, 270), True),
+        (text.render(text.MED_BOLD, "Colony Status", Colours.TEXT_LIGHT), Point(900, 270), True),
 
-        (text.SMALL_BOLD.render(f"Ore Price: {GameData.ore_price} | {'+' if GameData.ore_price_change >= 0 else ''}{GameData.ore_price_change}%", True, Colours.TEXT_LIGHT), Point(180, 350), False),
-        (text.SMALL_BOLD.render(f"Mine Price: {GameData.mine_price} | {'+' if GameData.mine_price_change >= 0 else ''}{GameData.mine_price_change}%", True, Colours.TEXT_LIGHT), Point(180, 400), False),
-        (text.SMALL_BOLD.render(f"Food Price: {GameData.food_price} | {'+' if GameData.food_price_change >= 0 else ''}{GameData.food_price_change}%", True, Colours.TEXT_LIGHT), Point(180, 450), False),
+        (text.render(text.SMALL_BOLD, f"Ore Price: {colony.state.ore_price} | {'+' if colony.state.ore_price_change >= 0 else ''}{colony.state.ore_price_change}%", Colours.TEXT_LIGHT), Point(180, 350), False),
+        (text.render(text.SMALL_BOLD, f"Mine Price: {colony.state.mine_price} | {'+' if colony.state.mine_price_change >= 0 else ''}{colony.state.mine_price_change}%", Colours.TEXT_LIGHT), Point(180, 400), False),
+        (text.render(text.SMALL_BOLD, f"Food Price: {colony.state.food_price} | {'+' if colony.state.food_price_change >= 0 else ''}{colony.state.food_price_change}%", Colours.TEXT_LIGHT), Point(180, 450), False),
 
     ])
     """
     
     infoboxes[0].redefine_data("text", [
-        (text.LARGE_BOLD.render("THE YEARS MARCH ON", True, Colours.WHITE), Point(600, 70), True),
-        (text.SMALL_BOLD.render(f"It is now {GameData.year}", True, Colours.TEXT_SUBTITLE), Point(600, 120), True),
+        (text.render(text.LARGE_BOLD, "THE YEARS MARCH ON", Colours.WHITE), Point(600, 70), True),
+        (text.render(text.SMALL_BOLD, f"It is now {colony.state.year}", Colours.TEXT_SUBTITLE), Point(600, 120), True),
     ])
     
 
@@ -184,14 +233,21 @@ update_yearly_report() # Run it for the first time, so that the infobox is set u
 ##############
 
 buttons = [
-    ui.Button(ui.ButtonType.NORMAL, Point(2400, 1180), Point(160, 90), None, [Colours.BUTTON, Colours.BUTTON_HOVER], [Image("images/calendar.png", game_res), AnimatedImage("images/acalendar", 100, game_res)], [next_year, update_yearly_report]),
+    ui.Button(ui.ButtonType.NORMAL, Point(2400, 1180), Point(160, 90), None, [Colours.BUTTON, Colours.BUTTON_HOVER], [Image("images/calendar.png", game_res), AnimatedImage("images/acalendar", 100, game_res)], [next_year, update_yearly_report], game_res),
     
-    ui.Button(ui.ButtonType.NORMAL, Point(200, 1300), Point(160, 70), text.SMALL_BOLD.render("Sell Ore", True, Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [sell_ore]),
-    ui.Button(ui.ButtonType.NORMAL, Point(620, 1350), Point(90, 60), text.MED_BOLD.render("-", True, Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [sell_mine]),
-    ui.Button(ui.ButtonType.NORMAL, Point(780, 1350), Point(90, 60), text.MED_BOLD.render("+", True, Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [buy_mine]),
-    ui.Button(ui.ButtonType.NORMAL, Point(1300, 1350), Point(160, 70), text.SMALL_BOLD.render("Buy Food", True, Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [buy_food])
+    ui.Button(ui.ButtonType.NORMAL, Point(200, 1300), Point(160, 70), text.render(text.SMALL_BOLD, "Sell Ore", Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [sell_ore], game_res),
+    ui.Button(ui.ButtonType.NORMAL, Point(620, 1350), Point(90, 60), text.render(text.MED_BOLD, "-", Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [sell_mine], game_res),
+    ui.Button(ui.ButtonType.NORMAL, Point(780, 1350), Point(90, 60), text.render(text.MED_BOLD, "+", Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [buy_mine], game_res),
+    ui.Button(ui.ButtonType.NORMAL, Point(1300, 1350), Point(160, 70), text.render(text.SMALL_BOLD, "Buy Food", Colours.BLACK), [Colours.BUTTON, Colours.BUTTON_HOVER], None, [buy_food], game_res)
 ]
 
+# Hit testing for every button. The game buttons only take input while no infobox is open, and each infobox's buttons only while it is open
+input_dispatcher = ui.InputDispatcher()
+input_dispatcher.add_layer(ui.InputLayer("game", buttons, active = lambda: view == 1 and current_infobox < 0))
+for infobox_number, infobox in enumerate(infoboxes):
+    input_dispatcher.add_layer(ui.InputLayer(f"infobox {infobox_number}", infobox.data.get("buttons") or [], infobox.screen_to_local,
+                                             lambda number = infobox_number, box = infobox: view == 1 and current_infobox == number and box.accepting_input(), modal = True))
+
 miner = AnimatedImage("images/miners", 1000, game_res)
 house = AnimatedImage("images/houses", 1200, game_res)
 
@@ -201,138 +257,188 @@ mines_icon = Image("images/mines.png", game_res)
 food_icon = Image("images/food.png", game_res)
 people_icon = Image("images/people.png", game_res)
 
-miner_positions = [
-Point(320, 50) * game_res.scaling_factor,
-Point(320, 240) * game_res.scaling_factor,
-Point(320, 430) * game_res.scaling_factor,
-Point(320, 620) * game_res.scaling_factor,
-Point(520, 50) * game_res.scaling_factor,
-Point(520, 240) * game_res.scaling_factor,
-Point(520, 430) * game_res.scaling_factor,
-Point(520, 620) * game_res.scaling_factor,
-Point(720, 50) * game_res.scaling_factor,
-Point(720, 240) * game_res.scaling_factor,
-Point(720, 430) * game_res.scaling_factor,
-Point(720, 620) * game_res.scaling_factor,
-Point(920, 50) * game_res.scaling_factor,
-Point(920, 240) * game_res.scaling_factor,
-Point(920, 430) * game_res.scaling_factor,
-Point(920, 620) * game_res.scaling_factor,
-]
 
-house_positions = []
-for position in miner_positions:
-    house_positions.append(position + Point(1075, 35) * game_res.scaling_factor)
+# Pack the sprites on the first screen into one atlas, so they share a few large surfaces instead of one surface each.
+# Everything else, like the buttons' hover animations, is left to load on first use or when the asset registry preloads it
+sprite_atlas = SpriteAtlas()
+sprite_atlas.pack(miner, house, ore_icon, dollar_icon, mines_icon, food_icon, people_icon, satisfaction_dial.dial_image, satisfaction_dial.hand_image,
+                  *(button.images[0] for button in buttons if button.images))
+
+# Mines and houses fill procedural grids of 4 x 4 slot chunks, which scroll and zoom once there are more than fit on screen
+field_layout = field.FieldLayout(Point(200, 190))
+mine_field = field.Field(miner, Point(320, 50), field_layout, game_res, background_rects[0])
+house_field = field.Field(house, Point(1395, 85), field_layout, game_res, background_rects[1])
+
+# Hotbar icons at fixed positions, scaled once here and drawn with one blits() call whenever the static layer is built. Added after packing
+# the atlas. This batch belongs to the static layer alone, anything drawn each frame should use a batch of its own
+background_batch = SpriteBatch()
+background_batch.add("ore icons", ore_icon, [Point(130, 1120), Point(630, 1120)], True)
+background_batch.add("dollar icons", dollar_icon, [Point(130, 1190), Point(630, 1190), Point(1230, 1190), Point(1830, 1190)], True)
+background_batch.add("mines icons", mines_icon, [Point(630, 1270)], True)
+background_batch.add("food icons", food_icon, [Point(1230, 1120)], True)
+background_batch.add("people icons", people_icon, [Point(1830, 1120)], True)
+
+def draw_static_background(surface):
+    # Everything in here is drawn once into the static layer, and only drawn again if the resolution or background colours change
+
+    surface.fill(Colours.BLUE)
+
+    pygame.draw.rect(surface, Colours.LIGHT_GRAYBLUE, background_rects[0])
+    pygame.draw.rect(surface, Colours.LIGHT_BLUE, background_rects[1])
+    pygame.draw.rect(surface, Colours.PANEL_DARKGREY, background_rects[2])
+
+    # Constant hotbar labels and icons
+    text.write(surface, text.MEDIUM, Colours.TEXT_SUBTITLE, (2300, 1330), "Next Year")
+
+    text.write(surface, text.LARGE_BOLD, Colours.TEXT_LIGHT, (200, 1050), "ORE", True)
+    text.write(surface, text.LARGE_BOLD, Colours.TEXT_LIGHT, (700, 1050), "MINES", True)
+    text.write(surface, text.LARGE_BOLD, Colours.TEXT_LIGHT, (1300, 1050), "FOOD", True)
+    text.write(surface, text.LARGE_BOLD, Colours.TEXT_LIGHT, (1900, 1050), "COLONY", True)
+
+    for icons in ("ore icons", "dollar icons", "mines icons", "food icons", "people icons"):
+        background_batch.queue(icons)
+    background_batch.draw(surface)
+
+background_layer = render.StaticLayer(draw_static_background)
+
+def background_key():
+    # Inputs of the static layer. If any of these change the layer is rebuilt
+    return (game_res.current_res, Colours.BLUE, Colours.LIGHT_GRAYBLUE, Colours.LIGHT_BLUE, Colours.PANEL_DARKGREY, Colours.TEXT_LIGHT, Colours.TEXT_SUBTITLE)
+
+def house_count():
+    # One house per 8 residents, with at most as many houses as there can be mines
+    return min(int(colony.state.people / 8), colony.max_mines)
+
+def next_deadline():
+    """ Milliseconds until something on screen changes without any input, 0 if it changes every frame, None if never. """
+
+    if view != 1:
+        return None
+
+    deadlines = [tween.animations.next_deadline()]
+    if current_infobox > -1:
+        deadlines.append(infoboxes[current_infobox].next_deadline())
+    else: # Only what is actually visible
+        if colony.state.mines:
+            deadlines.append(miner.next_deadline())
+        if house_count():
+            deadlines.append(house.next_deadline())
+        deadlines.extend(button.next_deadline() for button in buttons)
+        deadlines.append(satisfaction_dial.next_deadline())
+
+    return min((deadline for deadline in deadlines if deadline is not None), default = None)
 
 ###############
 ##### Main Loop
 
-while True:
+def process_frame(events):
+    """ Runs one frame of the game: input, logic, rendering and presenting. Split out of main() so the benchmarks can drive it. """
+    global update_zones
+    global quitting
 
     ### Events
 
+    frame_profiler.begin("events")
+
     pressed_keys = []
-    pressed_clicks = [False, False, False]
+    mouse_events = []
+
+    for event in events:
 
-    for event in pygame.event.get():
+        if event.type in (MOUSEMOTION, MOUSEBUTTONDOWN):
+            mouse_events.append(map_mouse_event(event))
 
-        if event.type == MOUSEBUTTONDOWN:
-            pressed_clicks = pygame.mouse.get_pressed()
+        if event.type == MOUSEWHEEL and view == 1 and current_infobox < 0:
+            mine_field.handle_event(event, colony.state.mines, mouse_position()) or house_field.handle_event(event, house_count(), mouse_position())
 
         if event.type == KEYDOWN:
             if event.key == K_ESCAPE:
-                pygame.quit()
-                sys.exit()
+                quitting = True
+            if event.key == K_F2: # Debug overlay showing which regions are being redrawn
+                renderer.toggle_debug()
+            if event.key == K_F3: # Frame time overlay
+                frame_profiler.toggle()
+                renderer.invalidate()
+            if event.key == K_F4:
+                frame_profiler.export("frame_profile.csv")
 
         if event.type == QUIT:
-            pygame.quit()
-            sys.exit()
+            quitting = True
+
+    frame_profiler.end("events")
 
     if view == 0: # MAIN MENU
-        pass
+        assets.preload() # Nothing here needs the game's assets yet, so it is a good time to load them
 
     elif view == 1: # GAME
 
         ##### UI Logic #####
 
+        # Buttons, both in and outside of infoboxes. Only does any work when the mouse moved or clicked
+        frame_profiler.begin("ui_logic")
+        input_dispatcher.sync(mouse_position())
+        for event in mouse_events:
+            invoked = input_dispatcher.handle_event(event)
+            if invoked is not None:
+                fired_actions.append([action.__name__ for action in invoked])
+        frame_profiler.end("ui_logic")
+
         # Infoboxes
-        if current_infobox > -1:
-            infoboxes[current_infobox].process(Point(*pygame.mouse.get_pos()), pressed_clicks, None)
+        if current_infobox > -1 and rendering:
+            frame_profiler.begin("render")
             update_zones.append(infoboxes[current_infobox].render(screen, frame_time))
-        else:
-        # Check buttons outside of infoboxes
-            for button in buttons:
-                button.check(pygame.mouse.get_pos(), pressed_clicks[0])
+            frame_profiler.end("render")
 
         ##### Logic #####
 
-        miner.tick(frame_time)
-        house.tick(frame_time)
+        frame_profiler.begin("animation")
+        active_time = max(0, frame_time - frame_pacer.waited) # Time spent idle is not part of any tween or swing, they all start after waking
+        tween.animations.advance(active_time)
+        satisfaction_dial.update(active_time)
+        animation_clock.advance(frame_time) # Every AnimatedImage, including the ones in buttons and infoboxes
+        frame_profiler.end("animation")
 
         ##### Render #####
         
-        if current_infobox < 0:
+        if not rendering:
+            pass
 
-            # Background
-            screen.fill(Colours.BLUE)
-            
-            pygame.draw.rect(screen, Colours.LIGHT_GRAYBLUE, background_rects[0])
-            pygame.draw.rect(screen, Colours.LIGHT_BLUE, background_rects[1])
-            pygame.draw.rect(screen, Colours.PANEL_DARKGREY, background_rects[2])
+        elif current_infobox < 0:
+            frame_profiler.begin("render")
 
-            # Gameplay Images + Animations
-            for position in miner_positions[0:GameData.mines]:
-                miner.render(screen, position)
+            # Static layer: background, panels, constant labels and icons
+            renderer.blit(background_layer.get(background_key(), screen.get_size()), (0, 0))
 
-            houses = int(GameData.people / 8)
-            if houses > 16:
-                houses = 16
-            for position in house_positions[0:houses]:
-                house.render(screen, position)
+            # Gameplay Images + Animations
+            mine_field.render(renderer, colony.state.mines)
+            house_field.render(renderer, house_count())
 
             # Buttons
             for button in buttons:
-                button.render(screen, frame_time)
-
-            # Rendering hotbar elements
-            text.write(screen, text.MEDIUM, Colours.TEXT_SUBTITLE, (2300, 1330), "Next Year")
-            text.write(screen, text.LARGE_BOLD, Colours.TEXT_LIGHT, (200, 1050), "ORE", True)
-            
-
-            ore_icon.render(screen, Point(130, 1120), True)
-            dollar_icon.render(screen, Point(130, 1190), True)
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (165, 1100), f"Stored: {GameData.stored_ore}T")
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (165, 1170), f"Price: ${GameData.ore_price}")
-
-            text.write(screen, text.LARGE_BOLD, Colours.TEXT_LIGHT, (700, 1050), "MINES", True)
-
-            ore_icon.render(screen, Point(630, 1120), True)
-            dollar_icon.render(screen, Point(630, 1190), True)
-            mines_icon.render(screen, Point(630, 1270), True)
+                button.render(renderer, frame_time)
 
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (665, 1100), f"{GameData.ore_per_mine}T/mine")
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (665, 1170), f"Price: ${GameData.mine_price}")
-            text.write(screen, text.MEDIUM, Colours.WHITE, (665, 1250), f"Mines: {GameData.mines}")
+            satisfaction_dial.render(Point(1750, 1220))
 
+            # Dynamic hotbar text
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (165, 1100), f"Stored: {colony.state.stored_ore}T")
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (165, 1170), f"Price: ${colony.state.ore_price}")
 
-            text.write(screen, text.LARGE_BOLD, Colours.TEXT_LIGHT, (1300, 1050), "FOOD", True)
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (665, 1100), f"{colony.state.ore_per_mine}T/mine")
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (665, 1170), f"Price: ${colony.state.mine_price}")
+            text.write(renderer, text.MEDIUM, Colours.WHITE, (665, 1250), f"Mines: {colony.state.mines}")
 
-            food_icon.render(screen, Point(1230, 1120), True)
-            dollar_icon.render(screen, Point(1230, 1190), True)
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (1265, 1100), f"Food: {colony.state.stored_food} units")
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (1265, 1170), f"Price: ${colony.state.food_price}")
 
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (1265, 1100), f"Food: {GameData.stored_food} units")
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (1265, 1170), f"Price: ${GameData.food_price}")
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (1865, 1100), f"{colony.state.people} residents")
+            text.write(renderer, text.SMALL, Colours.TEXT_SUBTITLE, (1865, 1170), f"Bank: ${colony.state.money}")
 
 
-            text.write(screen, text.LARGE_BOLD, Colours.TEXT_LIGHT, (1900, 1050), "COLONY", True)
+            #text.write(renderer, text.SMALL, Colours.BLACK, (10, 1400), f"FPS: {round(frame_pacer.clock.get_fps(), 1)}")
+            if frame_profiler.overlay: # The extra figures take a little work to gather, so only while they are shown
+                frame_profiler.render_overlay(renderer, text, extra = {**frame_pacer.stats(), **assets.stats()})
 
-            people_icon.render(screen, Point(1830, 1120), True)
-            dollar_icon.render(screen, Point(1830, 1190), True)
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (1865, 1100), f"{GameData.people} residents")
-            text.write(screen, text.SMALL, Colours.TEXT_SUBTITLE, (1865, 1170), f"Bank: ${GameData.money}")
-
-
-            #text.write(screen, text.SMALL, Colours.BLACK, (10, 1400), f"FPS: {round(clock.get_fps(), 1)}")
+            frame_profiler.end("render")
 
 
         elif infoboxes[current_infobox].newly_opened: # When infobox was just opened
@@ -344,18 +450,151 @@ while True:
             screen.blit(background_dimmer, (0, 0))
 
 
+    if not rendering:
+        return
+
+    frame_profiler.begin("present")
+
     if len(update_zones) > 0:
         if infoboxes[current_infobox].newly_opened: # Do one full pass to ensure that the dimming surface is rendered
-            pygame.display.flip()
+            display.flip()
             infoboxes[current_infobox].newly_opened = False
 
         else: # Only update the pixels containing infoboxes
-            for zone in update_zones:
-                pygame.display.update(zone)
+            display.update(update_zones)
 
             update_zones = []
     else:
         #pygame.draw.circle(screen, Colours.RED, pygame.mouse.get_pos(), 3)
-        pygame.display.flip()
+        renderer.present()
+
+    frame_profiler.end("present")
+
+def run(record_path = None):
+    global frame_time
+    global recorder
+
+    if record_path:
+        recorder = replay.Recorder(record_path, colony)
+
+    events = []
+    while True:
+        process_frame(events)
+        assets.preload() # Once the first frame is on screen, load the rest in the background
+
+        if recorder:
+            recorder.record(events, frame_time, frame_pacer.waited, pygame.mouse.get_pos(), pygame.key.get_mods(), fired_actions)
+        fired_actions.clear()
+        if quitting:
+            quit_game()
+
+        events = frame_pacer.wait(next_deadline()) # Sleeps until input arrives or the next animation frame is due
+        frame_time = frame_pacer.frame_time
+
+def run_replay(path, fast = False):
+    """ Plays a recording back through process_frame, with the recorded frame timings, and checks it ends on the recorded colony.
+        At normal speed the gaps between recorded frames are split into 60 FPS frames and played in real time; fast skips the
+        waiting and the rendering. Returns whether the final colony matched. """
+    global colony
+    global autosaver
+    global frame_time
+    global rendering
+
+    recording = replay.Recording(path)
+
+    if autosaver: # A replay should never overwrite the player's own autosave
+        autosaver.stop()
+        autosaver = None
+
+    colony = recording.start_colony()
+    satisfaction_dial.rotate_hand(colony.state.satisfaction)
+    rendering = not fast
+    frame_length = 1000 / 60
+    diverged = 0
+    frames = 0
+
+    start = time.perf_counter()
+    with replay.InputOverride() as recorded_input:
+        for frame in recording.frames:
+            gap_time, gap_idle = frame["gap"]
+            while gap_time > 0: # Any split works, the animations only depend on the totals
+                frame_time = gap_time if fast else min(gap_time, frame_length)
+                frame_pacer.waited = min(gap_idle, frame_time)
+                gap_time -= frame_time
+                gap_idle -= frame_pacer.waited
+                if not fast:
+                    time.sleep(frame_time / 1000)
+                process_frame([])
+                frames += 1
+
+            recorded_input.mouse_pos = tuple(frame["mouse"])
+            recorded_input.mods = frame["mods"]
+            frame_time, frame_pacer.waited = frame["time"]
+            if not fast:
+                time.sleep(frame_time / 1000)
+
+            fired_actions.clear()
+            process_frame(recording.events(frame))
+            frames += 1
+
+            if fired_actions != frame["actions"]:
+                diverged += 1
+                print(f"Frame {frame['frame']}: recorded actions {frame['actions']}, replay fired {fired_actions}")
+    elapsed = time.perf_counter() - start
+
+    matches = recording.end is None or savegame.dumps(colony) == recording.end
+    print(f"Replayed {len(recording.frames)} input frames ({frames} frames) in {elapsed:.3f}s, {frames / max(elapsed, 1e-9):,.0f} frames/s")
+    if recording.end is None:
+        print("Recording has no final state (the game did not exit normally), nothing to compare")
+    else:
+        print("Final state matches the recording" if matches else "Final state DIFFERS from the recording")
+    if diverged:
+        print(f"{diverged} frames fired different button actions")
+
+    return matches and not diverged
+
+def connect(address, session = None):
+    """ Plays a colony hosted by server.py instead of the local one. The server runs all the rules, so there is nothing to autosave.
+        Requests are made from the main loop, so the window stops responding while it waits for each reply. """
+    global colony
+    global autosaver
+
+    if autosaver:
+        autosaver.stop()
+        autosaver = None
+
+    colony = client.RemoteColony(client.Client(address), session)
+    satisfaction_dial.rotate_hand(colony.state.satisfaction)
+    update_yearly_report()
+    print(f"Playing colony {colony.number} on {address}, rejoin with --session {colony.session}")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Space Mines")
+    parser.add_argument("--record", metavar = "PATH", help = "record all input to PATH, for replaying later")
+    parser.add_argument("--replay", metavar = "PATH", help = "play back a recording instead of taking input")
+    parser.add_argument("--fast", action = "store_true", help = "with --replay, play back as fast as possible without rendering")
+    parser.add_argument("--server", metavar = "ADDRESS", help = "play on a game server at HOST:PORT or unix:PATH")
+    parser.add_argument("--session", metavar = "TOKEN", help = "with --server, carry on with an existing colony")
+    args = parser.parse_args()
+
+    if args.server and (args.record or args.replay):
+        parser.error("recordings need the colony's random number generator, so they only work with local games")
+    if args.session and not args.server:
+        parser.error("--session needs --server")
+
+    if args.server:
+        try:
+            connect(args.server, args.session)
+        except (OSError, client.RemoteError, client.ProtocolError) as error:
+            pygame.quit()
+            sys.exit(f"Could not join the game on {args.server}: {error}")
+
+    if args.replay:
+        matched = run_replay(args.replay, args.fast)
+        pygame.quit()
+        sys.exit(0 if matched else 1)
+
+    run(args.record)
 
-    frame_time = clock.tick(60)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
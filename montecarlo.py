@@ -0,0 +1,210 @@
+""" Vectorised Monte Carlo simulator for the Space Mines economy.
+
+    Advances N colonies x Y years at once as NumPy arrays, using the same rules as simulation.Colony.next_year
+    (mine price x0.55-1.45 with a floor, ore x0.75-1.25, food x0.8-1.2, ore production ore_per_mine * (mines - randint(0, 1))).
+
+    Random numbers come from one numpy Generator per seed, drawn as uniform floats in a fixed layout:
+    9 per colony for the starting values, then 4 per colony per year. Each uniform u is turned into an integer in [a, b] as
+    a + int(u * (b - a + 1)). UniformDraws does the same thing for the scalar engine, so reference_colony() can replay any
+    single colony through simulation.Colony and get exactly the same numbers.
+
+    Usage: python montecarlo.py [colonies] [years] [seed]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import simulation
+
+PERCENTILES = (5, 25, 50, 75, 95)
+METRICS = ("money", "mines", "ore_price", "mine_price", "food_price")
+
+INITIAL_DRAWS = 9
+YEARLY_DRAWS = 4
+
+class UniformDraws:
+    """ Stands in for random.Random inside simulation.Colony, turning a fixed sequence of uniform floats into randint() results. """
+
+    def __init__(self, uniforms):
+        self.uniforms = iter(uniforms)
+
+    def randint(self, a, b):
+        return a + int(next(self.uniforms) * (b - a + 1))
+
+    def randrange(self, start, stop):
+        return self.randint(start, stop - 1)
+
+def draw_integers(uniforms, low, high):
+    """ Vector version of UniformDraws.randint. """
+    return low + (uniforms * (high - low + 1)).astype(np.int64)
+
+class Batch:
+    """ N colonies stored as one array per field.
+
+        Prices are kept as float64 arrays holding whole numbers, which is exactly what int(price * change) produces in the scalar
+        engine, and saves converting back and forth every year. All yearly work happens in place on preallocated buffers. """
+
+    def __init__(self, generator, colonies):
+
+        self.colonies = colonies
+        u = generator.random((INITIAL_DRAWS, colonies))
+
+        # Same order as simulation.new_state
+        self.year = draw_integers(u[0], 2300, 2501)
+        self.mines = draw_integers(u[1], 3, 8)
+        self.people = draw_integers(u[2], 40, 80)
+        self.money = draw_integers(u[3], 200, 500) * self.people
+        self.food_price = draw_integers(u[4], 100, 300).astype(np.float64)
+        self.ore_price = draw_integers(u[5], 50, 80).astype(np.float64)
+        self.mine_price = draw_integers(u[6], 3000, 6000).astype(np.float64)
+        self.ore_per_mine = draw_integers(u[7], 8, 20)
+        self.stored_ore = draw_integers(u[8], 40, 79)
+
+        # Scratch buffers reused every year
+        self.draws = np.empty((YEARLY_DRAWS, colonies))
+        self.mask = np.empty(colonies, dtype = bool)
+        self.low = np.empty(colonies)
+        self.change = np.empty(colonies)
+        self.whole = np.empty(colonies, dtype = np.int64)
+
+    def walk_price(self, price, u, floor, low, floor_low, high):
+        """ price = int(price * randint(low if price > floor else floor_low, high) / 100), in place. """
+
+        mask, low_values, change = self.mask, self.low, self.change
+
+        np.greater(price, floor, out = mask)
+        np.multiply(mask, low - floor_low, out = low_values)
+        low_values += floor_low # Lower bound of the randint for each colony
+
+        np.subtract(high + 1, low_values, out = change) # b - a + 1
+        change *= u
+        np.floor(change, out = change) # int(u * (b - a + 1))
+        change += low_values
+        change /= 100
+
+        price *= change
+        np.floor(price, out = price)
+
+    def next_year(self):
+        """ One call of simulation.Colony.next_year for every colony at once. Consumes YEARLY_DRAWS uniforms per colony. """
+
+        u = self.draws
+        self.year += 1
+
+        self.walk_price(self.mine_price, u[0], 800, 55, 120, 145)
+        self.walk_price(self.ore_price, u[1], 40, 75, 115, 125)
+        self.walk_price(self.food_price, u[2], 40, 80, 110, 120)
+
+        # randint(0, 1) is 1 exactly when u >= 0.5
+        np.greater_equal(u[3], 0.5, out = self.mask)
+        np.subtract(self.mines, self.mask, out = self.whole)
+        self.whole *= self.ore_per_mine
+        self.stored_ore += self.whole
+
+    def sell_ore(self):
+        np.copyto(self.whole, self.ore_price, casting = "unsafe")
+        self.whole *= self.stored_ore
+        self.money += self.whole
+        self.stored_ore[:] = 0
+
+    def get(self, metric):
+        return getattr(self, metric)
+
+    def state(self):
+        """ Per-colony values as int64 arrays, named like the ColonyState fields. """
+        fields = ("year", "mines", "people", "money", "food_price", "ore_price", "mine_price", "ore_per_mine", "stored_ore")
+        return {field: self.get(field).astype(np.int64) for field in fields}
+
+def run(generator, colonies, years, sell_ore_each_year, on_year = None):
+    batch = Batch(generator, colonies)
+    if on_year:
+        on_year(0, batch)
+
+    for year in range(1, years + 1):
+        generator.random(out = batch.draws)
+        batch.next_year()
+        if sell_ore_each_year:
+            batch.sell_ore()
+        if on_year:
+            on_year(year, batch)
+
+    return batch
+
+def simulate(colonies, years, seed = 0, sell_ore_each_year = True, percentile_sample = 100_000):
+    """ Runs the simulation and returns a dict of metric -> array of shape (years + 1, len(PERCENTILES)).
+        Row 0 is the starting state, row n is the state after n years.
+
+        Sorting a million values per metric per year costs far more than the simulation itself, so when there are more than
+        percentile_sample colonies, the bands are taken from a fixed random subset of that size. Pass None to always use every colony. """
+
+    generator = np.random.default_rng(seed)
+
+    sample = None
+    if percentile_sample is not None and colonies > percentile_sample:
+        # Separate generator so the sample does not change the simulation's random stream
+        sample = np.sort(np.random.default_rng((seed, 1)).choice(colonies, percentile_sample, replace = False))
+
+    bands = {metric: np.empty((years + 1, len(PERCENTILES))) for metric in METRICS}
+
+    def record(row, batch):
+        # One partition call per year covering all metrics
+        stacked = np.stack([batch.get(metric) if sample is None else batch.get(metric)[sample] for metric in METRICS])
+        values = np.percentile(stacked, PERCENTILES, axis = 1, method = "lower")
+        for i, metric in enumerate(METRICS):
+            bands[metric][row] = values[:, i]
+
+    run(generator, colonies, years, sell_ore_each_year, record)
+
+    return bands
+
+def reference_colony(seed, colonies, index, years, sell_ore_each_year = True):
+    """ Replays colony number index of simulate(colonies, years, seed) through the scalar simulation.Colony. """
+
+    generator = np.random.default_rng(seed)
+
+    initial = generator.random((INITIAL_DRAWS, colonies))[:, index]
+    yearly = [generator.random((YEARLY_DRAWS, colonies))[:, index] for _ in range(years)]
+
+    colony = simulation.Colony(rng = UniformDraws(initial))
+    for draws in yearly:
+        colony.rng = UniformDraws(draws)
+        colony.next_year()
+        if sell_ore_each_year:
+            colony.sell_ore()
+
+    return colony
+
+def final_state(colonies, years, seed = 0, sell_ore_each_year = True):
+    """ Full per-colony state after the last year, used to check results against reference_colony(). """
+    return run(np.random.default_rng(seed), colonies, years, sell_ore_each_year).state()
+
+def verify(colonies = 1000, years = 50, seed = 0, samples = 20):
+    """ Checks that a sample of colonies match the scalar engine exactly. """
+
+    state = final_state(colonies, years, seed)
+
+    for index in np.linspace(0, colonies - 1, samples).astype(int):
+        reference = reference_colony(seed, colonies, index, years).state
+        for field in state:
+            if getattr(reference, field) != state[field][index]:
+                return False
+
+    return True
+
+if __name__ == "__main__":
+    colonies = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    print(f"Scalar engine match: {verify(seed = seed)}")
+
+    start = time.perf_counter()
+    bands = simulate(colonies, years, seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{colonies} colonies x {years} years in {elapsed:.2f}s")
+    print("Percentiles: " + ", ".join(f"p{p}" for p in PERCENTILES))
+    for metric in METRICS:
+        print(f"{metric} (final year): {bands[metric][-1].astype(int).tolist()}")
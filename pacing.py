@@ -0,0 +1,80 @@
+""" Frame pacing for the main loop.
+
+    Most of the time nothing on screen is moving except the miner and house animations, which only change frame every second or so.
+    Instead of redrawing at the frame cap regardless, the main loop tells the FramePacer how long it is until something changes by itself
+    (the next deadline), and the pacer sleeps in pygame.event.wait() until either input arrives or that deadline is reached.
+    While something is animating every frame (a deadline of 0) it falls back to clock.tick() at the frame cap.
+
+    The pacer also keeps track of how much CPU time the process uses compared to wall time, for the F3 overlay. """
+
+import time
+
+import pygame
+
+class FramePacer:
+
+    def __init__(self, max_fps = 60, idle = True, max_idle = 1000, cpu_window = 1.0):
+
+        self.max_fps = max_fps # Frame cap while animating, 0 for uncapped
+        self.idle = idle # False always runs at the frame cap, like the original loop
+        self.max_idle = max_idle # Longest single sleep in milliseconds, even with nothing scheduled
+
+        self.clock = pygame.time.Clock()
+        self.frame_time = 0 # Milliseconds since the previous frame, including any time spent idle
+        self.waited = 0 # Milliseconds of frame_time spent asleep waiting for input
+        self.idle_frames = 0
+        self.frames = 0
+
+        # CPU usage, measured over windows of cpu_window seconds
+        self.cpu_window = cpu_window
+        self.window_wall = time.perf_counter()
+        self.window_cpu = time.process_time()
+        self.cpu_usage = 0.0 # Fraction of one core
+        self.fps = 0.0
+
+    @property
+    def frame_interval(self):
+        return 1000 / self.max_fps if self.max_fps else 0
+
+    def wait(self, deadline = None):
+        """ Blocks until the next frame is due and returns its events.
+
+            deadline is the number of milliseconds until something on screen changes without any input, 0 if the screen has to be
+            redrawn every frame, or None if nothing will change until the player does something. """
+
+        events = []
+        self.waited = 0
+
+        if self.idle and (deadline is None or deadline > self.frame_interval):
+            timeout = self.max_idle if deadline is None else min(deadline, self.max_idle)
+
+            start = time.perf_counter()
+            event = pygame.event.wait(max(1, int(timeout)))
+            self.waited = (time.perf_counter() - start) * 1000
+
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+            self.idle_frames += 1
+
+        self.frame_time = self.clock.tick(self.max_fps) # Still applies the cap, so a stream of mouse movement cannot go over it
+        events.extend(pygame.event.get())
+
+        self.frames += 1
+        self.measure_cpu()
+
+        return events
+
+    def measure_cpu(self):
+        wall = time.perf_counter()
+        elapsed = wall - self.window_wall
+        if elapsed < self.cpu_window:
+            return
+
+        cpu = time.process_time()
+        self.cpu_usage = (cpu - self.window_cpu) / elapsed
+        self.fps = self.frames / elapsed
+
+        self.window_wall, self.window_cpu, self.frames = wall, cpu, 0
+
+    def stats(self):
+        return {"cpu %": f"{self.cpu_usage * 100:.1f}", "fps": f"{self.fps:.1f}", "cap": str(self.max_fps or "none")}
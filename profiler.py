@@ -0,0 +1,120 @@
+""" Per-phase frame timing.
+
+    The main loop wraps each phase of a frame (events, UI logic, animation, render, present) in begin()/end() calls.
+    Timings go into a fixed-size ring buffer per phase, so memory use never grows, and can be shown as an on-screen
+    overlay of p50/p95/p99 per phase or exported as CSV or JSON lines. While disabled, begin() and end() return
+    straight away, so the calls can stay in the loop permanently. """
+
+import csv
+import json
+import time
+from array import array
+
+from classes import *
+
+class RingBuffer:
+    """ Keeps the last capacity samples of one phase, in milliseconds. """
+
+    def __init__(self, capacity):
+
+        self.samples = array("d", bytes(8 * capacity))
+        self.capacity = capacity
+        self.index = 0
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def values(self):
+        """ Samples oldest to newest. """
+        if self.count < self.capacity:
+            return self.samples[:self.count].tolist()
+        return (self.samples[self.index:] + self.samples[:self.index]).tolist()
+
+    def percentiles(self, *percents):
+        ordered = sorted(self.samples[:self.count])
+        if not ordered:
+            return [0.0 for _ in percents]
+        return [ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] for percent in percents]
+
+class FrameProfiler:
+
+    PHASES = ("events", "ui_logic", "animation", "render", "present")
+
+    def __init__(self, capacity = 600, enabled = False):
+
+        self.capacity = capacity # 10 seconds at 60 FPS
+        self.enabled = enabled
+        self.overlay = False
+
+        self.buffers = {name: RingBuffer(capacity) for name in self.PHASES}
+        self.starts = {}
+
+        self.overlay_lines = []
+        self.frames_until_refresh = 0
+
+    def toggle(self):
+        """ Turns both timing and the overlay on or off. """
+        self.enabled = not self.enabled
+        self.overlay = self.enabled
+
+    def begin(self, name):
+        if not self.enabled:
+            return
+        self.starts[name] = time.perf_counter()
+
+    def end(self, name):
+        if not self.enabled:
+            return
+        start = self.starts.pop(name, None)
+        if start is None:
+            return
+
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            buffer = self.buffers[name] = RingBuffer(self.capacity)
+        buffer.add((time.perf_counter() - start) * 1000)
+
+    def summary(self):
+        """ {phase: (p50, p95, p99)} in milliseconds. """
+        return {name: tuple(buffer.percentiles(50, 95, 99)) for name, buffer in self.buffers.items() if buffer.count}
+
+    def render_overlay(self, screen, text, location = (10, 10), refresh_frames = 30, extra = None):
+        if not self.overlay:
+            return
+
+        # Sorting every buffer every frame would cost more than most of the phases being measured
+        if self.frames_until_refresh <= 0:
+            self.overlay_lines = [("phase", "p50 ms", "p95 ms", "p99 ms")]
+            for name, values in self.summary().items():
+                self.overlay_lines.append((name, *(f"{value:.2f}" for value in values)))
+            for name, value in (extra or {}).items(): # Other figures worth seeing alongside the timings, e.g. CPU usage
+                self.overlay_lines.append((name, value, "", ""))
+            self.frames_until_refresh = refresh_frames
+        self.frames_until_refresh -= 1
+
+        x, y = location
+        column_width = 80
+        line_height = text.TINY.get_linesize()
+        screen.fill(Colours.BLACK, pygame.Rect(x - 5, y - 5, column_width * 4 + 30, line_height * len(self.overlay_lines) + 10))
+        for row, line in enumerate(self.overlay_lines):
+            for column, cell in enumerate(line):
+                text.write(screen, text.TINY, Colours.WHITE, (x + column * (column_width + 10), y + row * line_height), cell, native = False)
+
+    def export(self, path):
+        """ Writes every stored sample, as CSV if path ends in .csv, otherwise as JSON lines. """
+
+        rows = [(name, i, value) for name, buffer in self.buffers.items() for i, value in enumerate(buffer.values())]
+
+        if path.endswith(".csv"):
+            with open(path, "w", newline = "") as file:
+                writer = csv.writer(file)
+                writer.writerow(("phase", "sample", "ms"))
+                writer.writerows(rows)
+        else:
+            with open(path, "w") as file:
+                for name, i, value in rows:
+                    file.write(json.dumps({"phase": name, "sample": i, "ms": value}) + "\n")
@@ -0,0 +1,255 @@
+import math
+
+import pygame
+from classes import *
+
+class DirtyRenderer:
+    """ Draws the game view by only repainting the parts of the screen that changed since the last frame.
+
+        Drawables (Image, AnimatedImage, Button, hotbar text, SatisfactionDial) render onto this object instead of the real screen.
+        Each blit or fill they make is recorded as a command, which is how every drawable reports what it looks like this frame.
+        Commands that differ from the previous frame (different frame surface, new text, hover colour, rotated hand, moved rect)
+        mark their old and new rects as dirty. Overlapping dirty rects are merged, only the commands touching a dirty region are
+        replayed with the screen clipped to that region, and only those regions are passed to pygame.display.update(). """
+
+    def __init__(self, screen, max_regions = 8, display = pygame.display):
+
+        self.screen = screen
+        self.display = display # pygame.display, or an Upscaler when screen is an offscreen surface
+        self.max_regions = max_regions # If more regions than this are dirty, they are merged into one bounding rect
+
+        self.commands = []
+        self.previous_commands = []
+
+        self.full_redraw = True # First frame always needs everything drawn
+        self.debug = False # Outlines the dirty regions on screen
+        self.debug_rects = [] # Outlines drawn last frame, which need to be painted over
+
+        self.last_regions = []
+
+    ### Surface-like interface used by the drawables
+
+    def get_width(self):
+        return self.screen.get_width()
+
+    def get_height(self):
+        return self.screen.get_height()
+
+    def get_size(self):
+        return self.screen.get_size()
+
+    def get_rect(self, **kwargs):
+        return self.screen.get_rect(**kwargs)
+
+    def blit(self, source, dest, area = None, special_flags = 0):
+        if isinstance(dest, pygame.Rect):
+            x, y = dest.topleft
+        else:
+            x, y = dest[0], dest[1]
+
+        if area is not None:
+            area = pygame.Rect(area)
+            width, height = area.size
+            area = tuple(area)
+        else:
+            width, height = source.get_size()
+
+        rect = (int(x), int(y), width, height)
+        self.commands.append((rect, source, (x, y), area, special_flags))
+
+        return pygame.Rect(rect)
+
+    def blits(self, blit_sequence, doreturn = 1):
+        # Entries of (source, (x, y), area tuple or None), which is what SpriteBatch queues and Field.render() submits, are recorded here directly rather than through blit()
+        commands = self.commands
+        start = len(commands)
+
+        for item in blit_sequence:
+            if len(item) == 3 and type(item[1]) is tuple and (item[2] is None or type(item[2]) is tuple):
+                source, (x, y), area = item
+                width, height = source.get_size() if area is None else area[2:]
+                commands.append(((int(x), int(y), width, height), source, (x, y), area, 0))
+            else:
+                self.blit(*item)
+
+        if doreturn:
+            return [pygame.Rect(command[0]) for command in commands[start:]]
+
+    def fill(self, colour, rect = None, special_flags = 0):
+        if rect is None:
+            rect = self.screen.get_rect()
+        rect = tuple(pygame.Rect(rect))
+
+        self.commands.append((rect, None, tuple(colour), None, special_flags))
+
+        return pygame.Rect(rect)
+
+    ### Frame handling
+
+    def invalidate(self):
+        """ Forces the next present() to redraw and update the whole screen, e.g. after an infobox closes. """
+        self.full_redraw = True
+
+    def toggle_debug(self):
+        self.debug = not self.debug
+        self.full_redraw = True
+
+    def find_dirty_rects(self):
+        if self.commands == self.previous_commands:
+            return []
+
+        # Commands present in only one of the two frames are the ones that changed
+        previous = set(self.previous_commands)
+        current = set(self.commands)
+
+        dirty = [pygame.Rect(command[0]).inflate(2, 2) for command in previous.symmetric_difference(current)] # Inflated to cover float positions being truncated
+        return dirty
+
+    def merge_rects(self, rects):
+        """ Repeatedly unions overlapping rects until none overlap. """
+
+        merged = [rect.clip(self.screen.get_rect()) for rect in rects]
+        merged = [rect for rect in merged if rect.width > 0 and rect.height > 0]
+
+        changed = True
+        while changed:
+            changed = False
+            result = []
+            for rect in merged:
+                for i, other in enumerate(result):
+                    if rect.colliderect(other):
+                        result[i] = other.union(rect)
+                        changed = True
+                        break
+                else:
+                    result.append(rect)
+            merged = result
+
+        if len(merged) > self.max_regions:
+            merged = [merged[0].unionall(merged[1:])]
+
+        return merged
+
+    def replay(self, region):
+        self.screen.set_clip(region)
+
+        for rect, source, dest, area, special_flags in self.commands:
+            if not region.colliderect(rect):
+                continue
+
+            if source is None:
+                self.screen.fill(dest, rect, special_flags)
+            else:
+                self.screen.blit(source, dest, area, special_flags)
+
+        self.screen.set_clip(None)
+
+    def present(self):
+        """ Draws the recorded frame and pushes the changed parts of it to the display. Returns the regions that were updated. """
+
+        if self.full_redraw:
+            regions = [self.screen.get_rect()]
+        else:
+            regions = self.merge_rects(self.find_dirty_rects() + self.debug_rects)
+
+        for region in regions:
+            self.replay(region)
+
+        self.debug_rects = []
+        if self.debug:
+            for region in regions:
+                pygame.draw.rect(self.screen, Colours.RED, region, 2)
+                self.debug_rects.append(region)
+
+        if self.full_redraw:
+            self.display.flip()
+            self.full_redraw = False
+        elif regions:
+            self.display.update(regions)
+
+        self.previous_commands = self.commands
+        self.commands = []
+        self.last_regions = regions
+
+        return regions
+
+class StaticLayer:
+    """ A pre-composited surface for everything that never changes between frames (background fill, panels, constant labels and icons).
+        It is built once by calling build_function on a fresh surface, and is only rebuilt when the key passed to get() changes,
+        e.g. when the resolution or the colour theme is changed. Dynamic layers are then blitted on top of it each frame. """
+
+    def __init__(self, build_function):
+
+        self.build_function = build_function
+
+        self.key = None
+        self.surface = None
+        self.rebuilds = 0
+
+    def invalidate(self):
+        self.surface = None
+
+    def get(self, key, size):
+        if self.surface is None or key != self.key:
+            # Always a new surface, so the DirtyRenderer sees a different source and repaints everything it covers
+            surface = pygame.Surface(size).convert()
+            self.build_function(surface)
+
+            self.surface = surface
+            self.key = key
+            self.rebuilds += 1
+
+        return self.surface
+
+class Upscaler:
+    """ Stands in for pygame.display in render scale mode, where the game is drawn to an offscreen surface smaller than the window.
+
+        flip() scales the whole surface up to the window in one pass and presents it. update() only scales up and presents the
+        regions it is given, so the dirty rect savings of DirtyRenderer carry over to the window, and frames where nothing changed
+        cost nothing here. smooth uses bilinear filtering, which looks softer but costs several times as much as the default
+        nearest neighbour scaling. """
+
+    def __init__(self, window, surface, smooth = False):
+
+        self.window = window
+        self.surface = surface
+        self.smooth = smooth
+
+        self.ratio = (window.get_width() / surface.get_width(), window.get_height() / surface.get_height())
+        self.upscaled_pixels = 0 # Window pixels written so far, to compare against drawing at full size
+
+    def upscale(self, source, destination):
+        if self.smooth:
+            pygame.transform.smoothscale(source, destination.get_size(), destination)
+        else:
+            pygame.transform.scale(source, destination.get_size(), destination)
+        self.upscaled_pixels += destination.get_width() * destination.get_height()
+
+    def to_window(self, rect):
+        """ The window pixels covering rect on the surface. """
+        rect = pygame.Rect(rect)
+        left, top = int(rect.left * self.ratio[0]), int(rect.top * self.ratio[1])
+        return pygame.Rect(left, top, math.ceil(rect.right * self.ratio[0]) - left, math.ceil(rect.bottom * self.ratio[1]) - top)
+
+    def flip(self):
+        self.upscale(self.surface, self.window)
+        pygame.display.flip()
+
+    def update(self, rects = None):
+        """ Same as pygame.display.update: a rect, a list of rects, or None for the whole window. """
+
+        if rects is None:
+            return self.flip()
+        if not isinstance(rects, list):
+            rects = [rects]
+
+        window_rects = []
+        bounds = self.surface.get_rect()
+        for rect in rects:
+            rect = pygame.Rect(rect).clip(bounds)
+            if not rect.width or not rect.height:
+                continue
+            window_rect = self.to_window(rect).clip(self.window.get_rect())
+            self.upscale(self.surface.subsurface(rect), self.window.subsurface(window_rect))
+            window_rects.append(window_rect)
+        pygame.display.update(window_rects)
@@ -0,0 +1,111 @@
+""" Recording and replaying play sessions.
+
+    A recording is a JSON lines file. The first line holds the colony the session started from, as a savegame snapshot, which includes
+    the seed and the full state of the colony's random number generator. Every frame that had input gets a line with its events, the
+    mouse position and modifier keys at the time, the button actions the input fired, and the frame timings. Frames without input are
+    only counted, as a gap of time before the next recorded frame. The last line holds the colony snapshot the session ended with.
+
+    Lines are flushed as they are written, so a recording survives the game crashing, which is when it is most useful. """
+
+import json
+
+import pygame
+
+import savegame
+
+VERSION = 1
+
+RECORDED_EVENTS = {pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL, pygame.KEYDOWN, pygame.KEYUP, pygame.QUIT}
+
+def encode_event(event):
+    attributes = {name: value for name, value in event.dict.items() if isinstance(value, (int, float, str, bool, tuple, list))}
+    return {"type": event.type, "name": pygame.event.event_name(event.type), **attributes}
+
+def decode_event(data):
+    attributes = {name: tuple(value) if isinstance(value, list) else value for name, value in data.items() if name not in ("type", "name")}
+    return pygame.event.Event(data["type"], attributes)
+
+def is_quit(event):
+    return event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE)
+
+class Recorder:
+
+    def __init__(self, path, colony):
+
+        self.file = open(path, "w")
+        self.frame = 0
+        self.gap_time = 0 # Frame time and idle time of the frames since the last recorded one
+        self.gap_idle = 0
+
+        self.write({"version": VERSION, "seed": colony.seed, "start": savegame.dumps(colony).hex()})
+
+    def write(self, line):
+        self.file.write(json.dumps(line) + "\n")
+        self.file.flush()
+
+    def record(self, events, frame_time, waited, mouse_pos, mods, actions):
+        """ Called once per frame, after it has been processed, with the frame_time and idle time that frame was given. """
+
+        self.frame += 1
+        events = [event for event in events if event.type in RECORDED_EVENTS]
+        if not events and not actions:
+            self.gap_time += frame_time
+            self.gap_idle += waited
+            return
+
+        self.write({
+            "frame": self.frame,
+            "gap": [self.gap_time, self.gap_idle],
+            "time": [frame_time, waited],
+            "mouse": list(mouse_pos),
+            "mods": mods,
+            "events": [encode_event(event) for event in events],
+            "actions": actions,
+        })
+        self.gap_time = self.gap_idle = 0
+
+    def close(self, colony):
+        self.write({"frames": self.frame, "end": savegame.dumps(colony).hex()})
+        self.file.close()
+
+class Recording:
+
+    def __init__(self, path):
+
+        with open(path) as file:
+            lines = [json.loads(line) for line in file if line.strip()]
+
+        header = lines[0]
+        if header.get("version") != VERSION:
+            raise ValueError(f"Recording version {header.get('version')} is not supported (expected {VERSION})")
+
+        self.seed = header["seed"]
+        self.start = bytes.fromhex(header["start"])
+
+        footer = lines[-1] if "end" in lines[-1] else None # Missing if the game crashed while recording
+        self.end = bytes.fromhex(footer["end"]) if footer else None
+        self.frames = [line for line in lines[1:] if "frame" in line]
+
+    def start_colony(self):
+        return savegame.loads(self.start)
+
+    def events(self, frame):
+        """ The frame's events, without the ones that would quit the game. """
+        return [decode_event(event) for event in frame["events"] if not is_quit(decode_event(event))]
+
+class InputOverride:
+    """ Makes pygame.mouse.get_pos() and pygame.key.get_mods() return the recorded values while replaying. """
+
+    def __init__(self):
+        self.mouse_pos = (0, 0)
+        self.mods = 0
+        self.originals = None
+
+    def __enter__(self):
+        self.originals = (pygame.mouse.get_pos, pygame.key.get_mods)
+        pygame.mouse.get_pos = lambda: self.mouse_pos
+        pygame.key.get_mods = lambda: self.mods
+        return self
+
+    def __exit__(self, *exc):
+        pygame.mouse.get_pos, pygame.key.get_mods = self.originals
@@ -0,0 +1,159 @@
+""" Saving and loading colonies.
+
+    A save is a fixed-layout binary record: a small header, every field of the ColonyState, the colony's settings, and the full state of
+    its random.Random (624 words of Mersenne Twister state, its position, and the cached gauss value), followed by a CRC32 of everything
+    before it. Every save is the same size, so packing and unpacking is a couple of struct calls and takes microseconds.
+
+    Writes go to a temporary file which is then renamed over the old save, so a crash part way through never leaves a broken file.
+    The Autosaver does those writes on a background thread: the game hands it an already packed snapshot, which is the only work done
+    on the main thread, and the thread writes it out if it differs from the last one written. """
+
+import os
+import random
+import struct
+import threading
+import zlib
+
+from simulation import Colony, ColonyState
+
+MAGIC = b"SMSV"
+VERSION = 2 # 1 stored ore_produced as a double
+
+HEADER = struct.Struct("<4sH")
+STATE = struct.Struct("<qqqqqqqqqqddddqq") # ColonyState fields, in STATE_FIELDS order, then the spare slot
+SETTINGS = struct.Struct("<qQ?") # max_mines, seed, whether there is a seed
+RNG = struct.Struct("<I625Id?") # Random version, Mersenne Twister words and position, gauss_next, whether gauss_next is set
+CHECKSUM = struct.Struct("<I")
+
+STATE_FIELDS = (
+    "year", "mines", "people", "money", "food_price", "ore_price", "mine_price", "ore_per_mine", "stored_food", "stored_ore",
+    "satisfaction", "food_price_change", "ore_price_change", "mine_price_change", "ore_produced", # satisfaction and the changes are floats
+)
+FLOAT_FIELDS = {"satisfaction", "food_price_change", "ore_price_change", "mine_price_change"}
+
+SIZE = HEADER.size + STATE.size + SETTINGS.size + RNG.size + CHECKSUM.size
+
+class SaveError(Exception):
+    """ The data is not a save this version of the game can read. """
+
+###############
+##### Packing
+
+def dumps(colony: Colony):
+    if not isinstance(colony.rng, random.Random):
+        raise TypeError(f"Only colonies using random.Random can be saved, not {type(colony.rng).__name__}")
+
+    state = colony.state
+    values = []
+    for name in STATE_FIELDS:
+        value = getattr(state, name)
+        values.append(float(value) if name in FLOAT_FIELDS else int(value))
+    values.append(0) # Spare slot, keeps the layout fixed if another whole-number field is added
+
+    rng_version, words, gauss_next = colony.rng.getstate()
+
+    data = b"".join((
+        HEADER.pack(MAGIC, VERSION),
+        STATE.pack(*values),
+        SETTINGS.pack(colony.max_mines, colony.seed or 0, colony.seed is not None),
+        RNG.pack(rng_version, *words, gauss_next or 0.0, gauss_next is not None),
+    ))
+    return data + CHECKSUM.pack(zlib.crc32(data))
+
+def loads(data):
+    if len(data) != SIZE:
+        raise SaveError(f"Save is {len(data)} bytes, expected {SIZE}")
+
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SaveError("Not a Space Mines save")
+    if version != VERSION:
+        raise SaveError(f"Save format version {version} is not supported (expected {VERSION})")
+    if CHECKSUM.unpack_from(data, SIZE - CHECKSUM.size)[0] != zlib.crc32(memoryview(data)[:SIZE - CHECKSUM.size]):
+        raise SaveError("Save is corrupted")
+
+    offset = HEADER.size
+    values = STATE.unpack_from(data, offset)
+    state = ColonyState(**dict(zip(STATE_FIELDS, values))) # zip drops the spare slot
+
+    offset += STATE.size
+    max_mines, seed, has_seed = SETTINGS.unpack_from(data, offset)
+
+    offset += SETTINGS.size
+    rng_values = RNG.unpack_from(data, offset)
+    rng = random.Random()
+    rng.setstate((rng_values[0], rng_values[1:626], rng_values[626] if rng_values[627] else None))
+
+    return Colony(seed = seed if has_seed else None, state = state, rng = rng, max_mines = max_mines)
+
+###############
+##### Files
+
+def write_atomic(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def save(colony: Colony, path):
+    write_atomic(path, dumps(colony))
+
+def load(path):
+    with open(path, "rb") as file:
+        return loads(file.read())
+
+class Autosaver:
+    """ Writes snapshots to path on a background thread, at most once every interval seconds and only when they have changed. """
+
+    def __init__(self, path, interval = 1.0):
+
+        self.path = path
+        self.interval = interval
+
+        self.pending = None # Latest snapshot, replaced rather than queued so only the newest one is ever written
+        self.last_written = None
+        self.writes = 0
+        self.error = None # Last OSError, if writing failed
+
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target = self.run, name = "autosave", daemon = True)
+        self.thread.start()
+
+    def submit(self, colony: Colony):
+        """ Snapshots the colony. Called on the main thread, so it only packs the state and leaves the writing to the thread. """
+        self.pending = dumps(colony)
+        self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if self.stopped.is_set():
+                return
+            self.flush()
+            self.stopped.wait(self.interval) # Snapshots submitted meanwhile are combined into one write on the next pass
+
+    def flush(self):
+        data = self.pending
+        if data is None or data == self.last_written:
+            return
+        try:
+            write_atomic(self.path, data)
+            self.last_written = data
+            self.writes += 1
+        except OSError as error:
+            self.error = error # Autosaving should never crash the game
+
+    def stop(self):
+        """ Stops the thread after writing the latest snapshot. """
+        self.stopped.set()
+        self.wake.set()
+        self.thread.join()
+        self.flush()
@@ -0,0 +1,272 @@
+""" Game server hosting many independent colonies in one process.
+
+    Every session is its own simulation.Colony, with its own seed and random number generator, played through the same rules as the
+    local game. The server is a single asyncio event loop: each request only runs a few microseconds of simulation, so one thread
+    can serve thousands of players without any locking.
+
+    Messages in both directions are a 4 byte big-endian length followed by that many bytes of UTF-8 JSON. Requests are objects with
+    an "op" and an optional "id", which is echoed back so a client can pipeline several requests on one connection. Responses carry
+    "ok", and either the result fields or an "error" message. Requests on one connection are answered in order.
+
+        new          {name, seed}       -> {session, number, max_mines, state}
+        join         {session}          -> {number, max_mines, state}
+        state        {session}          -> {state}
+        act          {session, action}  -> {done, state}     action is a simulation.Action name, e.g. "SELL_ORE"
+        close        {session}          -> {}
+        leaderboard  {count}            -> {entries: [{number, name, year, score}, ...]}
+        stats        {}                 -> {sessions, connections, requests, uptime}
+
+    The session token returned by "new" is what a player uses to act on their colony, and is never shown to other players;
+    the leaderboard lists sessions by their public number instead. Seeds are never sent back, since knowing the seed of a colony
+    gives away every future price. The leaderboard is ranked at most once a second and shared by everyone asking in between. Sessions live in memory only and are gone when the server stops.
+
+    Usage: python server.py [--address HOST:PORT | unix:PATH] [--max-mines N] [--max-sessions N]
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import math
+import os
+import random
+import secrets
+import struct
+import time
+
+import simulation
+import tournament
+from simulation import Action
+
+DEFAULT_ADDRESS = "127.0.0.1:7480"
+
+LENGTH = struct.Struct(">I")
+MAX_MESSAGE = 64 * 1024 # Larger messages are a broken or hostile client, the connection is dropped
+WRITE_BUFFER_LIMIT = 256 * 1024 # Only wait for the socket to drain once this much is queued, so pipelined replies are not held up
+LEADERBOARD_INTERVAL = 1.0 # Seconds a leaderboard is reused for before it is ranked again
+LEADERBOARD_DEPTH = 100 # Entries ranked each time, so smaller requests in between share them
+
+class ProtocolError(Exception):
+    """ The other end sent something that is not a valid message. """
+
+class RequestError(Exception):
+    """ A well formed request that cannot be carried out. Sent back as an error response, the connection stays open. """
+
+###############
+##### Protocol
+
+def parse_address(address):
+    """ "unix:PATH" for a Unix socket, otherwise "HOST:PORT" for TCP. Returns ("unix", path) or ("tcp", (host, port)). """
+
+    if address.startswith("unix:"):
+        return "unix", address[5:]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Address should be HOST:PORT or unix:PATH, not {address!r}")
+    return "tcp", (host, int(port))
+
+def pack_message(message):
+    body = json.dumps(message, separators = (",", ":")).encode()
+    return LENGTH.pack(len(body)) + body
+
+def unpack_body(body):
+    try:
+        message = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ProtocolError(f"Message is not valid JSON: {error}") from None
+    if not isinstance(message, dict):
+        raise ProtocolError("Message is not a JSON object")
+    return message
+
+async def read_message(reader: asyncio.StreamReader):
+    """ Reads one message, or returns None if the connection was closed cleanly between messages. """
+
+    try:
+        header = await reader.readexactly(LENGTH.size)
+    except asyncio.IncompleteReadError as error:
+        if error.partial:
+            raise ProtocolError("Connection closed part way through a message") from None
+        return None
+
+    length, = LENGTH.unpack(header)
+    if length > MAX_MESSAGE:
+        raise ProtocolError(f"Message of {length} bytes is larger than the {MAX_MESSAGE} byte limit")
+    try:
+        return unpack_body(await reader.readexactly(length))
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Connection closed part way through a message") from None
+
+###############
+##### Sessions
+
+class Session:
+
+    def __init__(self, number, token, name, colony: simulation.Colony):
+
+        self.number = number # Public, shown on the leaderboard
+        self.token = token # Private, needed to play the colony
+        self.name = name
+        self.colony = colony
+
+class SessionManager:
+    """ Every colony on the server, and the requests that act on them. Independent of the networking, so it can be driven directly. """
+
+    def __init__(self, max_mines = simulation.MAX_MINES, max_sessions = 100_000):
+
+        self.max_mines = max_mines
+        self.max_sessions = max_sessions
+
+        self.sessions = {} # token -> Session
+        self.next_number = 1
+        self.leaderboard_cache = [] # Highest scoring entries first, as of leaderboard_time
+        self.leaderboard_time = -math.inf
+        self.requests = 0
+
+        self.handlers = {
+            "new": self.new,
+            "join": self.join,
+            "state": self.get_state,
+            "act": self.act,
+            "close": self.close,
+            "leaderboard": self.leaderboard,
+        }
+
+    def handle(self, request):
+        """ Runs one request and returns the response. """
+
+        self.requests += 1
+        response = {"id": request.get("id")}
+        try:
+            op = request.get("op")
+            handler = self.handlers.get(op) if isinstance(op, str) else None # A list or object as the op is not hashable
+            if handler is None:
+                raise RequestError(f"Unknown op {request.get('op')!r}")
+            response.update(handler(request))
+            response["ok"] = True
+        except RequestError as error:
+            response["ok"] = False
+            response["error"] = str(error)
+        return response
+
+    def session(self, request):
+        token = request.get("session")
+        session = self.sessions.get(token) if isinstance(token, str) else None
+        if session is None:
+            raise RequestError("No such session")
+        return session
+
+    def new(self, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError("Server is full")
+
+        seed = request.get("seed")
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        elif not isinstance(seed, int) or not 0 <= seed < 2 ** 64:
+            raise RequestError("Seed should be a whole number from 0 to 2^64 - 1")
+
+        name = str(request.get("name") or f"Colony {self.next_number}")[:32]
+        session = Session(self.next_number, secrets.token_hex(16), name, simulation.Colony(seed = seed, max_mines = self.max_mines))
+        self.sessions[session.token] = session
+        self.next_number += 1
+
+        return {"session": session.token, **self.join_response(session)}
+
+    def join_response(self, session):
+        return {"number": session.number, "max_mines": session.colony.max_mines, "state": vars(session.colony.state)}
+
+    def join(self, request):
+        return self.join_response(self.session(request))
+
+    def get_state(self, request):
+        return {"state": vars(self.session(request).colony.state)}
+
+    def act(self, request):
+        session = self.session(request)
+        name = request.get("action")
+        action = Action.__members__.get(name) if isinstance(name, str) else None
+        if action is None:
+            raise RequestError(f"Unknown action {name!r}")
+
+        done = session.colony.apply(action)
+        return {"done": done, "state": vars(session.colony.state)}
+
+    def close(self, request):
+        del self.sessions[self.session(request).token]
+        return {}
+
+    def leaderboard(self, request):
+        count = request.get("count", 10)
+        if not isinstance(count, int) or not 0 < count <= 1000:
+            raise RequestError("Count should be from 1 to 1000")
+
+        # Ranking every colony takes milliseconds, so it is done at most once per LEADERBOARD_INTERVAL however many players are looking,
+        # and only as far down as has been asked for
+        now = time.monotonic()
+        if now - self.leaderboard_time > LEADERBOARD_INTERVAL or len(self.leaderboard_cache) < min(count, len(self.sessions)):
+            best = heapq.nlargest(max(count, LEADERBOARD_DEPTH), self.sessions.values(), key = lambda session: tournament.score(session.colony.state))
+            self.leaderboard_cache = [{"number": session.number, "name": session.name, "year": session.colony.state.year, "score": tournament.score(session.colony.state)}
+                                      for session in best]
+            self.leaderboard_time = now
+
+        return {"entries": self.leaderboard_cache[:count]}
+
+###############
+##### Server
+
+class Server:
+
+    def __init__(self, manager: SessionManager):
+
+        self.manager = manager
+        self.connections = 0
+        self.started = time.monotonic()
+        self.manager.handlers["stats"] = self.stats
+
+    def stats(self, request):
+        return {"sessions": len(self.manager.sessions), "connections": self.connections, "requests": self.manager.requests, "uptime": time.monotonic() - self.started}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request = await read_message(reader)
+                if request is None:
+                    break
+                writer.write(pack_message(self.manager.handle(request)))
+                if writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+                    await writer.drain()
+        except ProtocolError as error:
+            writer.write(pack_message({"id": None, "ok": False, "error": str(error)}))
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def start(self, address):
+        kind, location = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(location):
+                os.unlink(location) # Left behind by a server that did not shut down cleanly
+            return await asyncio.start_unix_server(self.handle_connection, location)
+
+        return await asyncio.start_server(self.handle_connection, *location) # asyncio turns on TCP_NODELAY, so small replies go out straight away
+
+async def serve(address, manager: SessionManager):
+    server = await Server(manager).start(address)
+    print(f"Serving on {address} (max {manager.max_sessions} sessions)")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Host Space Mines colonies for remote players")
+    parser.add_argument("--address", default = DEFAULT_ADDRESS, help = f"HOST:PORT or unix:PATH (default {DEFAULT_ADDRESS})")
+    parser.add_argument("--max-mines", type = int, default = simulation.MAX_MINES)
+    parser.add_argument("--max-sessions", type = int, default = 100_000)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.address, SessionManager(args.max_mines, args.max_sessions)))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,150 @@
+""" Headless simulation core for Space Mines.
+
+    Holds the colony state and the yearly economy rules without touching pygame, so it can be imported by the GUI,
+    by balancing/testing tools, or by anything else that wants to step through years as fast as possible.
+    All randomness goes through the colony's own random.Random, so two colonies made with the same seed play out identically. """
+
+import enum
+import random
+from dataclasses import dataclass
+
+MAX_MINES = 16 # The mine field only has room for this many mines
+
+@dataclass
+class ColonyState:
+    """ Everything needed to describe a colony at a point in time. """
+
+    year: int
+    mines: int
+    people: int
+    money: int
+
+    food_price: int
+    ore_price: int
+    mine_price: int
+
+    ore_per_mine: int
+
+    stored_food: int = 100
+    stored_ore: int = 0
+    satisfaction: float = 1
+
+    food_price_change: float = 0
+    ore_price_change: float = 0
+    mine_price_change: float = 0
+    ore_produced: int = 0
+
+class Action(enum.Enum):
+    SELL_ORE = enum.auto()
+    BUY_MINE = enum.auto()
+    SELL_MINE = enum.auto()
+    BUY_FOOD = enum.auto()
+    NEXT_YEAR = enum.auto()
+
+def new_state(rng: random.Random):
+    """ Rolls the starting values of a new colony. """
+
+    year = rng.randint(2300, 2501)
+
+    mines = rng.randint(3, 8)
+    people = rng.randint(40, 80)
+    money = rng.randint(200, 500) * people
+
+    food_price = rng.randint(100, 300)
+    ore_price = rng.randint(50, 80)
+    mine_price = rng.randint(3000, 6000)
+
+    ore_per_mine = rng.randint(8, 20)
+
+    stored_ore = rng.randrange(40, 80)
+
+    return ColonyState(year, mines, people, money, food_price, ore_price, mine_price, ore_per_mine, stored_ore = stored_ore)
+
+class Colony:
+    """ A single colony and the rules for changing it. Each action returns True if it was carried out. """
+
+    def __init__(self, seed = None, state: ColonyState | None = None, rng = None, max_mines = MAX_MINES):
+
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed) # Anything with a randint(a, b) method works here
+        self.state = state if state is not None else new_state(self.rng)
+
+        self.max_mines = max_mines
+
+    def next_year(self):
+        state = self.state
+        rng = self.rng
+
+        state.year += 1
+
+        # Prices follow a random walk, with a floor that pushes them back up once they get too low
+        state.mine_price_change = (rng.randint(55 if state.mine_price > 800 else 120, 145) / 100)
+        state.mine_price = int(state.mine_price * state.mine_price_change)
+
+        state.ore_price_change = (rng.randint(75 if state.ore_price > 40 else 115, 125) / 100)
+        state.ore_price = int(state.ore_price * state.ore_price_change)
+
+        state.food_price_change = (rng.randint(80 if state.food_price > 40 else 110, 120) / 100)
+        state.food_price = int(state.food_price * state.food_price_change)
+
+        state.ore_produced = state.ore_per_mine * (state.mines - rng.randint(0, 1))
+        state.stored_ore += state.ore_produced
+
+        return True
+
+    def sell_ore(self):
+        state = self.state
+        state.money += state.stored_ore * state.ore_price
+        state.stored_ore = 0
+        return True
+
+    def buy_mine(self):
+        state = self.state
+        if state.money > state.mine_price and state.mines < self.max_mines:
+            state.money -= state.mine_price
+            state.mines += 1
+            return True
+        return False
+
+    def sell_mine(self):
+        state = self.state
+        if state.mines > 0:
+            state.mines -= 1
+            state.money += state.mine_price
+            return True
+        return False
+
+    def buy_food(self):
+        state = self.state
+        if state.money > state.food_price * 10:
+            state.stored_food += 10
+            state.money -= state.food_price * 10
+            return True
+        return False
+
+    def apply(self, action: Action):
+        return {
+            Action.SELL_ORE: self.sell_ore,
+            Action.BUY_MINE: self.buy_mine,
+            Action.SELL_MINE: self.sell_mine,
+            Action.BUY_FOOD: self.buy_food,
+            Action.NEXT_YEAR: self.next_year,
+        }[action]()
+
+    def step(self, years: int):
+        """ Advances several years without any player actions in between. """
+        for _ in range(years):
+            self.next_year()
+
+if __name__ == "__main__":
+    # Quick throughput check: python simulation.py
+    import time
+
+    colony = Colony(seed = 1)
+    years = 1_000_000
+
+    start = time.perf_counter()
+    colony.step(years)
+    elapsed = time.perf_counter() - start
+
+    print(f"{years} years in {elapsed:.2f}s ({years / elapsed:,.0f} years/s)")
@@ -0,0 +1,340 @@
+""" Expectimax solver for the Space Mines economy.
+
+    Finds the actions that maximise the expected net worth (tournament.score) of a colony after a horizon of H years. Each year the
+    player picks a move (sell the ore or not, buy or sell some number of mines, buy food) and then next_year() rolls the prices and
+    ore production. Moves within a year are taken in that order, which loses nothing: selling ore first only makes more money available,
+    and buying and selling mines in the same year cancels out.
+
+    The state is discretised so that states reached along different paths can share a result. Money, stored ore and prices are snapped
+    to geometric buckets (price_resolution apart), and each uniform price change is replaced by price_samples equally likely bucket means.
+    Results are kept in a TranspositionTable: fixed-size arrays indexed by the state's hash, capped at a given amount of memory, where a
+    new entry replaces an old one in the same slot unless the old one covers more years (and so cost more to work out).
+
+    Usage: python solver.py [--seed N] [--horizon H] [--memory MB] [--games N]
+"""
+
+import argparse
+import math
+import time
+from array import array
+
+import simulation
+import tournament
+from simulation import Action
+
+###############
+##### Transposition table
+
+class TranspositionTable:
+
+    ENTRY_SIZE = 8 + 8 + 1 # Key, value, years
+    MAX_YEARS = 127 # Years are kept in a signed byte
+
+    def __init__(self, memory_mb = 64):
+
+        self.capacity = max(1, int(memory_mb * 1024 * 1024 / self.ENTRY_SIZE))
+        self.keys = array("q", bytes(8 * self.capacity)) # 0 marks an empty slot
+        self.values = array("d", bytes(8 * self.capacity))
+        self.years = array("b", bytes(self.capacity))
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0 # Entries replaced by a different state
+        self.rejected = 0 # New entries dropped to keep a more expensive one
+
+    def get(self, key):
+        """ The value stored for key, or None. """
+        slot = key % self.capacity
+        if self.keys[slot] == key:
+            self.hits += 1
+            return self.values[slot]
+        self.misses += 1
+        return None
+
+    def put(self, key, years, value):
+        slot = key % self.capacity
+        stored_key = self.keys[slot]
+        if stored_key and stored_key != key:
+            if self.years[slot] > years:
+                self.rejected += 1
+                return
+            self.evictions += 1
+
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.years[slot] = years
+        self.stores += 1
+
+    def used(self):
+        return sum(1 for key in self.keys if key)
+
+    def memory_usage(self):
+        return self.capacity * self.ENTRY_SIZE
+
+###############
+##### Solver
+
+# A state is a tuple of (money, mines, stored ore, stored food, mine price, ore price, food price)
+# A move is (sell ore, change in mines, food purchases), packed into one int
+def pack_move(sell, mine_change, food):
+    return int(sell) | (mine_change + 4096) << 1 | food << 14
+
+def unpack_move(move):
+    return bool(move & 1), ((move >> 1) & 8191) - 4096, move >> 14
+
+def price_change_samples(low, high, samples):
+    """ Splits randint(low, high) / 100 into equally likely groups, as (mean change, probability) pairs. """
+
+    values = list(range(low, high + 1))
+    groups = [values[round(i * len(values) / samples):round((i + 1) * len(values) / samples)] for i in range(samples)]
+    return tuple((sum(group) / len(group) / 100, len(group) / len(values)) for group in groups if group)
+
+class Solver:
+
+    def __init__(self, ore_per_mine, max_mines = simulation.MAX_MINES, price_samples = 3, price_resolution = 0.02, memory_mb = 64, food_value = 0, passive = False):
+
+        self.ore_per_mine = ore_per_mine
+        self.max_mines = max_mines
+        self.food_value = food_value # What a unit of stored food is worth at the end. Net worth ignores food, so by default it is never bought
+        self.passive = passive # Only ever ends the year, for comparing against
+        self.log_step = math.log(1 + price_resolution)
+
+        self.table = TranspositionTable(memory_mb)
+
+        # Same price rules as simulation.Colony.next_year, for prices above and below their floors
+        self.mine_changes = {True: price_change_samples(55, 145, price_samples), False: price_change_samples(120, 145, price_samples)}
+        self.ore_changes = {True: price_change_samples(75, 125, price_samples), False: price_change_samples(115, 125, price_samples)}
+        food_samples = price_samples if food_value else 1 # The food price makes no difference unless food is worth buying
+        self.food_changes = {True: price_change_samples(80, 120, food_samples), False: price_change_samples(110, 120, food_samples)}
+
+        self.snapped = {} # Value -> snap() result, as the same few prices and amounts come up again and again
+        self.expected_prices = {}
+
+        self.evaluated = 0 # States worked out rather than found in the table
+        self.elapsed = 0
+
+    ### Discretisation
+
+    def snap(self, value):
+        """ Nearest bucket to value, as (bucket number, the value the bucket stands for). """
+        snapped = self.snapped.get(value)
+        if snapped is not None:
+            return snapped
+
+        if value == 0:
+            snapped = (0, 0)
+        else:
+            sign = 1 if value > 0 else -1
+            bucket = round(math.log(abs(value)) / self.log_step)
+            snapped = (sign * (bucket + 1), sign * round(math.exp(bucket * self.log_step)))
+
+        if len(self.snapped) > 1_000_000: # Keep the memo bounded too
+            self.snapped.clear()
+        self.snapped[value] = snapped
+        return snapped
+
+    def expected_price(self, changes, price):
+        """ Mean of int(price * change) over the sampled changes. """
+        key = (id(changes), price)
+        expected = self.expected_prices.get(key)
+        if expected is None:
+            expected = self.expected_prices[key] = sum(probability * int(price * change) for change, probability in changes)
+        return expected
+
+    def snap_state(self, state):
+        money, mines, ore, food, mine_price, ore_price, food_price = state
+        buckets = []
+        values = []
+        for value in (money, ore, mine_price, ore_price, food_price):
+            bucket, snapped = self.snap(value)
+            buckets.append(bucket)
+            values.append(snapped)
+        key = (mines, food, *buckets)
+        return key, (values[0], mines, values[1], food, values[2], values[3], values[4])
+
+    ### Search
+
+    def score(self, state):
+        money, mines, ore, food, mine_price, ore_price, food_price = state
+        return money + ore * ore_price + mines * mine_price + food * self.food_value
+
+    def moves(self, state):
+        """ Every (move, state after it) for the year. """
+
+        money, mines, ore, food, mine_price, ore_price, food_price = state
+        if self.passive:
+            return [(pack_move(False, 0, 0), state)]
+        results = []
+
+        for sell in ((False, True) if ore else (False,)):
+            cash = money + ore * ore_price if sell else money
+            stored_ore = 0 if sell else ore
+
+            # Every mine costs and earns the same, so the final score is linear in the number traded this year, and what is best
+            # to do afterwards is a max over such linear choices. The best trade is therefore always one of the extremes
+            mine_options = [(0, cash)]
+            if mines:
+                mine_options.append((-mines, cash + mines * mine_price))
+            if cash > mine_price and mines < self.max_mines:
+                bought = min(self.max_mines - mines, int((cash - 1) // mine_price)) # Buying needs more money than the price
+                mine_options.append((bought, cash - bought * mine_price))
+
+            for mine_change, cash_left in mine_options:
+                food_options = [(0, cash_left)]
+                if self.food_value * 10 > food_price * 10 and cash_left > food_price * 10:
+                    batches = int((cash_left - 1) // (food_price * 10)) # As many as can be afforded, buying needs more than the price
+                    food_options.append((batches, cash_left - batches * food_price * 10))
+
+                for batches, final_cash in food_options:
+                    results.append((pack_move(sell, mine_change, batches), (final_cash, mines + mine_change, stored_ore, food + batches * 10, mine_price, ore_price, food_price)))
+
+        return results
+
+    def expected(self, state, years):
+        """ Expected value of state after next_year(), with years - 1 more years to play. """
+
+        money, mines, ore, food, mine_price, ore_price, food_price = state
+
+        if years == 1:
+            # Nothing left to decide after this roll, and the outcomes are independent, so the expectation of the final score
+            # is the score at the expected prices and production. Saves recursing into every outcome for the last year
+            next_mine_price = self.expected_price(self.mine_changes[mine_price > 800], mine_price)
+            next_ore_price = self.expected_price(self.ore_changes[ore_price > 40], ore_price)
+            next_ore = ore + self.ore_per_mine * (mines - 0.5)
+            return money + next_ore * next_ore_price + mines * next_mine_price + food * self.food_value
+
+        # Outcomes of the same roll are shared between the moves and states that lead to it
+        key, state = self.snap_state(state)
+        key = hash((-years, key)) or 1
+        stored = self.table.get(key)
+        if stored is not None:
+            return stored
+
+        money, mines, ore, food, mine_price, ore_price, food_price = state
+        produced = (self.ore_per_mine * mines, self.ore_per_mine * (mines - 1)) # mines - randint(0, 1) working mines
+
+        total = 0.0
+        for mine_change, mine_probability in self.mine_changes[mine_price > 800]:
+            next_mine_price = int(mine_price * mine_change)
+            for ore_change, ore_probability in self.ore_changes[ore_price > 40]:
+                next_ore_price = int(ore_price * ore_change)
+                probability = mine_probability * ore_probability
+                for food_change, food_probability in self.food_changes[food_price > 40]:
+                    next_food_price = int(food_price * food_change)
+                    for ore_produced in produced:
+                        next_state = (money, mines, ore + ore_produced, food, next_mine_price, next_ore_price, next_food_price)
+                        total += probability * food_probability * 0.5 * self.value(next_state, years - 1)
+
+        self.table.put(key, years, total)
+        return total
+
+    def decide(self, state, years):
+        """ (best expected value, best move) for state with years left to play. """
+        best_value, best_move = -math.inf, 0
+        for move, after in self.moves(state):
+            value = self.expected(after, years)
+            if value > best_value:
+                best_value, best_move = value, move
+        return best_value, best_move
+
+    def value(self, state, years):
+        if years <= 0:
+            return self.score(state)
+
+        key, state = self.snap_state(state)
+        key = hash((years, key)) or 1 # 0 marks an empty table slot
+        stored = self.table.get(key)
+        if stored is not None:
+            return stored
+
+        self.evaluated += 1
+        value, _ = self.decide(state, years)
+        self.table.put(key, years, value)
+        return value
+
+    def solve(self, colony: simulation.Colony, years):
+        """ (expected net worth, actions for this year) for the colony with years to play. The root state is used exactly, unsnapped. """
+
+        if years > self.table.MAX_YEARS:
+            raise ValueError(f"Horizon of {years} years is more than the {self.table.MAX_YEARS} the transposition table can hold")
+
+        state = colony.state
+        root = (state.money, state.mines, state.stored_ore, state.stored_food, state.mine_price, state.ore_price, state.food_price)
+
+        start = time.perf_counter()
+        value, move = self.decide(root, years)
+        self.elapsed += time.perf_counter() - start
+
+        return value, move_actions(move)
+
+    def states_per_second(self):
+        return self.evaluated / self.elapsed if self.elapsed else 0.0
+
+def move_actions(move):
+    sell, mine_change, food = unpack_move(move)
+    actions = [Action.SELL_ORE] if sell else []
+    actions += [Action.BUY_MINE if mine_change > 0 else Action.SELL_MINE] * abs(mine_change)
+    actions += [Action.BUY_FOOD] * food
+    return actions + [Action.NEXT_YEAR]
+
+###############
+##### Reference bot
+
+class Optimal(tournament.Strategy):
+    """ Plays the solver's best move each year, looking horizon years ahead. Too slow for full tournaments, so not in STRATEGIES.
+        Works with tournament.play(). """
+
+    name = "optimal"
+
+    def __init__(self, horizon = 3, memory_mb = 64, years = None):
+        self.horizon = horizon
+        self.memory_mb = memory_mb
+        self.years = years # Length of the game if known, so the last years are planned up to the end rather than past it
+        self.solver = None
+        self.plan = []
+        self.year = 0
+
+    def start_game(self, colony):
+        self.solver = Solver(colony.state.ore_per_mine, colony.max_mines, memory_mb = self.memory_mb)
+        self.colony = colony
+        self.year = 0
+
+    def choose(self, state, actions_this_year):
+        if actions_this_year == 0:
+            horizon = self.horizon if self.years is None else max(1, min(self.horizon, self.years - self.year))
+            _, self.plan = self.solver.solve(self.colony, horizon)
+            self.year += 1
+        return self.plan[actions_this_year] if actions_this_year < len(self.plan) else Action.NEXT_YEAR
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Find the best moves for a colony with expectimax")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--horizon", type = int, default = 4)
+    parser.add_argument("--memory", type = float, default = 64, help = "transposition table size in MB")
+    parser.add_argument("--samples", type = int, default = 3, help = "outcomes per price change")
+    parser.add_argument("--games", type = int, default = 0, help = "also play this many seeded games against the tournament strategies")
+    args = parser.parse_args()
+
+    colony = simulation.Colony(seed = args.seed)
+    solver = Solver(colony.state.ore_per_mine, colony.max_mines, price_samples = args.samples, memory_mb = args.memory)
+    value, actions = solver.solve(colony, args.horizon)
+
+    table = solver.table
+    print(f"Seed {args.seed}, {args.horizon} years: expected net worth {value:,.0f} (now {tournament.score(colony.state):,})")
+    print(f"First year: {', '.join(action.name for action in actions)}")
+    print(f"{solver.evaluated:,} states in {solver.elapsed:.2f}s ({solver.states_per_second():,.0f} states/s)")
+    print(f"Table: {table.used():,}/{table.capacity:,} slots ({table.memory_usage() / 1024 / 1024:.0f}MB), {table.hits:,} hits, {table.evictions:,} evictions, {table.rejected:,} rejected")
+
+    # Price settings that leave nothing to gain, or that grow without limit, show up as the best play barely beating doing nothing or running away
+    passive, _ = Solver(colony.state.ore_per_mine, colony.max_mines, price_samples = args.samples, memory_mb = 1, passive = True).solve(colony, args.horizon)
+    if value <= passive * 1.01:
+        print(f"WARNING: the best play only reaches {value:,.0f} against {passive:,.0f} for doing nothing, the prices leave nothing to gain")
+    if value > tournament.score(colony.state) * 1000:
+        print("WARNING: expected net worth grows over 1000x, the prices may be running away")
+
+    if args.games:
+        strategies = [Optimal(args.horizon, args.memory, years = args.horizon)] + [strategy() for strategy in tournament.STRATEGIES.values()]
+        for strategy in strategies:
+            scores = [tournament.play(strategy, seed, args.horizon) for seed in range(args.seed, args.seed + args.games)]
+            print(f"{strategy.name:>16}: mean {sum(scores) / len(scores):>12,.0f}")
@@ -0,0 +1,166 @@
+""" Strategy tournament for tuning the Space Mines economy.
+
+    A strategy is a policy that looks at the colony each turn and picks one of the actions a player has
+    (sell ore, buy or sell a mine, buy food, or end the year). The tournament plays many seeded games per strategy on
+    simulation.Colony, fanned out over a process pool in chunks, and merges the final scores into one distribution per strategy.
+    Every strategy plays the same seeds, so differences come from the strategy rather than from luck.
+
+    Usage: python tournament.py [--games N] [--years N] [--seed N] [--workers N] [--chunk N]
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import simulation
+from simulation import Action
+
+MAX_ACTIONS_PER_YEAR = 64 # Stops a strategy that never ends the year from stalling a game
+
+###############
+##### Strategies
+
+class Strategy:
+    """ Base class for player strategies. choose() is called repeatedly each year until it returns Action.NEXT_YEAR. """
+
+    name = "base"
+
+    def start_game(self, colony: simulation.Colony):
+        pass
+
+    def choose(self, state: simulation.ColonyState, actions_this_year: int) -> Action:
+        raise NotImplementedError
+
+class Passive(Strategy):
+    """ Never does anything. The baseline every other strategy should beat. """
+
+    name = "passive"
+
+    def choose(self, state, actions_this_year):
+        return Action.NEXT_YEAR
+
+class SellEveryYear(Strategy):
+    """ Sells all ore every year and never trades mines. """
+
+    name = "sell_every_year"
+
+    def choose(self, state, actions_this_year):
+        if state.stored_ore > 0:
+            return Action.SELL_ORE
+        return Action.NEXT_YEAR
+
+class Expand(Strategy):
+    """ Sells ore and buys mines whenever it can afford one. """
+
+    name = "expand"
+
+    def choose(self, state, actions_this_year):
+        if state.stored_ore > 0:
+            return Action.SELL_ORE
+        if state.money > state.mine_price and state.mines < simulation.MAX_MINES:
+            return Action.BUY_MINE
+        return Action.NEXT_YEAR
+
+class PaybackTrader(Strategy):
+    """ Buys mines when they pay for themselves within a few years at the current ore price, and sells them when they don't.
+        Holds ore back while the ore price is below its starting price. """
+
+    name = "payback_trader"
+
+    def __init__(self, buy_years = 4, sell_years = 12):
+        self.buy_years = buy_years
+        self.sell_years = sell_years
+        self.starting_ore_price = 0
+
+    def start_game(self, colony):
+        self.starting_ore_price = colony.state.ore_price
+
+    def choose(self, state, actions_this_year):
+        yearly_income = state.ore_per_mine * state.ore_price
+        payback = state.mine_price / yearly_income if yearly_income > 0 else float("inf")
+
+        if state.stored_ore > 0 and state.ore_price >= self.starting_ore_price:
+            return Action.SELL_ORE
+        if payback < self.buy_years and state.money > state.mine_price and state.mines < simulation.MAX_MINES:
+            return Action.BUY_MINE
+        if payback > self.sell_years and state.mines > 0:
+            return Action.SELL_MINE
+        return Action.NEXT_YEAR
+
+STRATEGIES = {strategy.name: strategy for strategy in (Passive, SellEveryYear, Expand, PaybackTrader)}
+
+###############
+##### Games
+
+def score(state: simulation.ColonyState):
+    """ Net worth: money plus everything the colony could sell at current prices. """
+    return state.money + state.stored_ore * state.ore_price + state.mines * state.mine_price
+
+def play(strategy: Strategy, seed, years):
+    colony = simulation.Colony(seed = seed)
+    strategy.start_game(colony)
+
+    for _ in range(years):
+        for actions_this_year in range(MAX_ACTIONS_PER_YEAR):
+            action = strategy.choose(colony.state, actions_this_year)
+            if action == Action.NEXT_YEAR:
+                break
+            colony.apply(action)
+
+        colony.next_year()
+
+    return score(colony.state)
+
+def play_chunk(strategy_name, first_seed, games, years):
+    """ One unit of work for the process pool. Only names and numbers cross the process boundary. """
+    strategy = STRATEGIES[strategy_name]()
+    return strategy_name, [play(strategy, seed, years) for seed in range(first_seed, first_seed + games)]
+
+def run_tournament(strategy_names, games, years, seed = 0, workers = None, chunk_size = 500):
+    """ Plays games seeded seed .. seed + games - 1 for every strategy and returns {strategy name: list of scores}. """
+
+    scores = {name: [] for name in strategy_names}
+
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        futures = []
+        for name in strategy_names:
+            for first_seed in range(seed, seed + games, chunk_size):
+                futures.append(pool.submit(play_chunk, name, first_seed, min(chunk_size, seed + games - first_seed), years))
+
+        for future in futures:
+            name, chunk_scores = future.result()
+            scores[name].extend(chunk_scores)
+
+    return scores
+
+def summarise(scores):
+    summary = {}
+    for name, values in scores.items():
+        cuts = statistics.quantiles(values, n = 20) if len(values) > 1 else [values[0]] * 19
+        summary[name] = {
+            "games": len(values),
+            "mean": statistics.fmean(values),
+            "p5": cuts[0],
+            "p50": cuts[9],
+            "p95": cuts[18],
+        }
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Play seeded games of every strategy across all cores")
+    parser.add_argument("--games", type = int, default = 10000)
+    parser.add_argument("--years", type = int, default = 30)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--workers", type = int, default = None)
+    parser.add_argument("--chunk", type = int, default = 500)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = summarise(run_tournament(list(STRATEGIES), args.games, args.years, args.seed, args.workers, args.chunk))
+    elapsed = time.perf_counter() - start
+
+    total_games = args.games * len(STRATEGIES)
+    print(f"{total_games} games of {args.years} years in {elapsed:.2f}s ({total_games / elapsed:,.0f} games/s)")
+    for name, result in sorted(results.items(), key = lambda item: -item[1]["p50"]):
+        print(f"{name:>16}: mean {result['mean']:>12,.0f}  p5 {result['p5']:>12,.0f}  p50 {result['p50']:>12,.0f}  p95 {result['p95']:>12,.0f}")
@@ -0,0 +1,152 @@
+""" Tween engine used by the UI animations.
+
+    Easing curves are plain functions from progress (0 to 1) to an eased value. Rather than evaluating them every frame,
+    each (curve, duration, size) combination gets a keyframe table of pre-computed sizes, built once and shared by every
+    animation that uses the same settings. A TweenGroup keeps one clock for all of its tweens, and each tween only remembers
+    when it was started on that clock, so advancing the group is a single addition however many tweens it has. Which
+    keyframe a tween is on is worked out when it is read. Durations and deltas are in milliseconds, matching clock.tick(). """
+
+import functools
+import math
+
+SAMPLE_RATE = 240 # Keyframes per second of animation, comfortably above the frame rate
+
+###############
+##### Easing curves
+
+def linear(t):
+    return t
+
+def ease_in(t):
+    return t * t
+
+def ease_out(t):
+    return 1 - (1 - t) * (1 - t)
+
+def ease_in_out(t):
+    return 2 * t * t if t < 0.5 else 1 - ((-2 * t + 2) ** 2) / 2
+
+def ease_out_back(t):
+    # Overshoots slightly before settling, for a "pop" effect
+    c1 = 1.70158
+    c3 = c1 + 1
+    return 1 + c3 * (t - 1) ** 3 + c1 * (t - 1) ** 2
+
+def smoothstep(t):
+    return t * t * (3 - 2 * t)
+
+def sine_in_out(t):
+    return -(math.cos(math.pi * t) - 1) / 2
+
+EASINGS = {
+    "linear": linear,
+    "ease_in": ease_in,
+    "ease_out": ease_out,
+    "ease_in_out": ease_in_out,
+    "ease_out_back": ease_out_back,
+    "smoothstep": smoothstep,
+    "sine_in_out": sine_in_out,
+}
+
+def register_easing(name, function):
+    """ Adds a custom curve. function takes progress from 0 to 1 and should return 0 at 0 and 1 at 1. """
+    EASINGS[name] = function
+
+###############
+##### Keyframes
+
+def keyframe_count(duration):
+    return max(1, round(duration * SAMPLE_RATE / 1000))
+
+@functools.lru_cache(maxsize = 128)
+def keyframes(curve, duration, size):
+    """ Sizes for every keyframe of an animation from (0, 0) up to size, as a tuple of (width, height) tuples. """
+
+    ease = EASINGS[curve]
+    count = keyframe_count(duration)
+
+    frames = []
+    for i in range(count + 1):
+        value = ease(i / count)
+        frames.append((max(0, int(size[0] * value)), max(0, int(size[1] * value))))
+    return tuple(frames)
+
+###############
+##### Tweens
+
+class Tween:
+    __slots__ = ("duration", "count", "reverse", "group", "start_time", "stopped_elapsed")
+
+    def __init__(self, duration):
+
+        self.duration = duration
+        self.count = keyframe_count(duration)
+
+        self.reverse = False
+        self.group = None # The TweenGroup it was last started in, None while stopped
+        self.start_time = 0 # On the group's clock
+        self.stopped_elapsed = 0 # Where it was left while stopped
+
+    @property
+    def elapsed(self):
+        if self.group is None:
+            return self.stopped_elapsed
+        return min(self.duration, self.group.time - self.start_time)
+
+    @elapsed.setter
+    def elapsed(self, elapsed):
+        if self.group is None:
+            self.stopped_elapsed = elapsed
+        else:
+            self.group.seek(self, elapsed)
+
+    @property
+    def playing(self):
+        return self.group is not None and self.group.time - self.start_time < self.duration
+
+    @property
+    def index(self):
+        """ The keyframe it is on, resting on the last one once finished. """
+        step = min(self.count, int(self.elapsed * self.count / self.duration))
+        return self.count - step if self.reverse else step
+
+class TweenGroup:
+    """ Advances many tweens with one call per frame. The group only keeps track of when its last running tween ends, which is
+        all next_deadline() needs. """
+
+    def __init__(self):
+        self.time = 0
+        self.end_time = 0 # When the last tween started in the group finishes
+        self.tweens = set() # Tweens that may still be running, so stop() can work out the new end_time
+
+    def start(self, tween: Tween, reverse = False):
+        if tween.group not in (None, self):
+            tween.group.stop(tween)
+
+        tween.group = self
+        tween.reverse = reverse
+        self.seek(tween, 0)
+
+    def seek(self, tween: Tween, elapsed):
+        tween.start_time = self.time - elapsed
+        self.end_time = max(self.end_time, tween.start_time + tween.duration)
+        self.tweens.add(tween)
+
+    def stop(self, tween: Tween):
+        if tween.group is self:
+            tween.stopped_elapsed = tween.elapsed
+            tween.group = None
+            self.tweens.discard(tween)
+            self.end_time = max((other.start_time + other.duration for other in self.tweens), default = self.time)
+
+    def advance(self, delta):
+        self.time += delta
+        if self.tweens and self.time >= self.end_time:
+            self.tweens.clear() # Everything has finished. Finished tweens still read their last keyframe from the group's clock
+
+    def next_deadline(self):
+        """ 0 while any tween is running, since they change every frame, otherwise None. """
+        return 0 if self.time < self.end_time else None
+
+# Every UI animation registers here, and the main loop advances it once per frame
+animations = TweenGroup()
@@ -1,42 +1,107 @@
 import enum
 import pygame
+import math
+import threading
+from collections import OrderedDict
 from classes import *
+import tween
 
-def map_mouse_position(pos, game_res: GameResolution):
-    """ This function maps the real mouse position on the screen to its relative position on the unscaled game window. 
+def map_mouse_position(pos, game_res: GameResolution, target_res = None):
+    """ This function maps the real mouse position on the window to its relative position on the unscaled game window (or on target_res).
         Due to the way the alternate resolution settings are implemeneted, without this mouse mapping, buttons would be
-        difficult or impossible to press and the visual position of the cursor on the screen would be different to where the game thinks it is. """
+        difficult or impossible to press and the visual position of the cursor on the screen would be different to where the game thinks it is.
+        In render scale mode the window is larger than the surface the game is drawn on, so positions are mapped to current_res instead. """
 
-    if game_res.scaling_factor.x != 1: # If there is any need to scale
-        x_map = ((game_res.native_res[0]) / (game_res.current_res[0]) * (pos[0]))
-        y_map = ((game_res.native_res[1]) / (game_res.current_res[1]) * (pos[1]))
+    window_res = game_res.window_res or game_res.current_res
+    target_res = target_res or game_res.native_res
+
+    if window_res == target_res: # No need to scale
+        return (pos[0], pos[1])
+
+    x_map = ((target_res[0]) / (window_res[0]) * (pos[0]))
+    y_map = ((target_res[1]) / (window_res[1]) * (pos[1]))
 
     return (x_map, y_map)
 
+class RenderCache:
+    """ Bounded LRU cache of rendered text surfaces, keyed by (font, colour, text, antialias).
+        Almost none of the hotbar strings change between frames, so rasterising them again every frame is wasted work.
+        Surfaces handed out by this cache are shared, so they must never be drawn onto. """
+
+    def __init__(self, capacity = 256):
+
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, antialias, colour):
+        key = (font, colour, text, antialias)
+
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, colour)
+        self.surfaces[key] = surface
+
+        if len(self.surfaces) > self.capacity: # Drop the least recently used surface
+            self.surfaces.popitem(last = False)
+            self.evictions += 1
+
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def stats(self):
+        return {"size": len(self.surfaces), "capacity": self.capacity, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+# Shared by Text.write, Button titles and InfoBox text entries
+render_cache = RenderCache()
+
 class Text:
-    def __init__(self, scaling_factor):
-        self.TINY = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(16 * scaling_factor))
-        self.SMALL = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(24 * scaling_factor))
-        self.SMALL_BOLD = pygame.font.Font("fonts/segoe/segoe-ui-bold.ttf", int(24 * scaling_factor))
-        self.MEDIUM = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(32 * scaling_factor))
-        self.LARGE = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(48 * scaling_factor))
-        self.MED_BOLD = pygame.font.Font("fonts/segoe/segoe-ui-bold.ttf", int(48 * scaling_factor))
-        self.LARGE_BOLD = pygame.font.Font("fonts/segoe/segoe-ui-bold.ttf", int(64 * scaling_factor))
+    def __init__(self, scaling_factor: Point):
+
+        # Fonts are rebuilt for the new scaling factor, so every cached surface is now the wrong size
+        render_cache.clear()
+
+        self.scaling_factor = scaling_factor # Locations scale on each axis, font sizes follow the height
+
+        self.TINY = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(16 * scaling_factor.y))
+        self.SMALL = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(24 * scaling_factor.y))
+        self.SMALL_BOLD = pygame.font.Font("fonts/segoe/segoe-ui-bold.ttf", int(24 * scaling_factor.y))
+        self.MEDIUM = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(32 * scaling_factor.y))
+        self.LARGE = pygame.font.Font("fonts/segoe/segoe-ui.ttf", int(48 * scaling_factor.y))
+        self.MED_BOLD = pygame.font.Font("fonts/segoe/segoe-ui-bold.ttf", int(48 * scaling_factor.y))
+        self.LARGE_BOLD = pygame.font.Font("fonts/segoe/segoe-ui-bold.ttf", int(64 * scaling_factor.y))
+
+    def render(self, font, text, colour, antialias = True):
+        return render_cache.render(font, text, antialias, colour)
 
-    def write(self, screen, font, colour, location, text, centered = False):
+    def write(self, screen, font, colour, location, text, centered = False, native = True):
+        """ location is in native (2560 x 1440) pixels like everything else, or in screen pixels if native is False. """
+
+        text_render = self.render(font, text, colour)
+        if native:
+            location = (location[0] * self.scaling_factor.x, location[1] * self.scaling_factor.y)
 
         if centered:
-            text_render = font.render(text, True, colour)
             screen.blit(text_render, text_render.get_rect(center = location))
         else:
-            screen.blit(font.render(text, True, colour), location)
+            screen.blit(text_render, location)
 
 class ButtonType(enum.Enum):
     NORMAL = enum.auto()
     CHECKBOX = enum.auto()
 
 class Button:
-    def __init__(self, type: ButtonType, pos: Point, size: Point, title: str, colours: list[Colours], images: list | None, actions: list):
+    def __init__(self, type: ButtonType, pos: Point, size: Point, title: str, colours: list[Colours], images: list | None, actions: list, game_res: GameResolution = None):
 
 
         self.type = type
@@ -49,86 +114,204 @@ class Button:
 
         self.hovered = False
 
-        self.button_rect = pygame.Rect((self.pos.x - self.size.x / 2), (self.pos.y - self.size.y / 2), self.size.x, self.size.y)
+        # Buttons drawn straight onto the screen are given game_res, and scale to it. Buttons inside an infobox are drawn onto its
+        # unscaled surface, which the infobox scales as a whole, so they leave it out
+        scaling_factor = game_res.scaling_factor if game_res else Point(1, 1)
+        self.screen_pos = self.pos * scaling_factor # Centre on screen, which is what the mouse is compared against
+        screen_size = self.size * scaling_factor
+
+        self.button_rect = pygame.Rect((self.screen_pos.x - screen_size.x / 2), (self.screen_pos.y - screen_size.y / 2), screen_size.x, screen_size.y)
 
-    def check(self, mouse_pos: tuple, clicked):
+    def hit_rect(self):
+        """ The area that responds to the mouse. For image buttons this covers both the default and hovered image, so it does not change with hover state. """
 
         if self.images:
-            current_image = self.images[{True: 1, False: 0}[self.hovered]]
-            collide_rect = pygame.Rect((self.pos.x - current_image.get_rect().width / 2), (self.pos.y - current_image.get_rect().height / 2), current_image.get_rect().width, current_image.get_rect().height)
-        else:
-            collide_rect = self.button_rect
-
-        if collide_rect.collidepoint(mouse_pos):
-            self.hovered = True
-
-            if clicked:
-                for i, action in enumerate(self.actions):
-                    if self.type == ButtonType.CHECKBOX and i == 0: # Checkbox specific logic
-                        result = action()
-                        if result:
-                            #self.title = TextSize.SMALL_BOLD.render("X", True, Colours.BLACK) # Always using smallbold, does not account for varying button sizes
-                            # Need to add another checked indicator
-                            pass
-                        else:
-                            self.title = None
-                    else: # Default button type logic
-                        action()
-                        return True
+            width = max(image.get_rect().width for image in self.images)
+            height = max(image.get_rect().height for image in self.images)
+            return pygame.Rect((self.screen_pos.x - width / 2), (self.screen_pos.y - height / 2), width, height)
+        return self.button_rect
+
+    def click(self):
+        """ Runs the button's actions and returns the ones that actually ran. Normal buttons stop after their first action. """
+        invoked = []
+        for i, action in enumerate(self.actions):
+            invoked.append(action)
+            if self.type == ButtonType.CHECKBOX and i == 0: # Checkbox specific logic
+                result = action()
+                if result:
+                    #self.title = TextSize.SMALL_BOLD.render("X", True, Colours.BLACK) # Always using smallbold, does not account for varying button sizes
+                    # Need to add another checked indicator
+                    pass
+                else:
+                    self.title = None
+            else: # Default button type logic
+                action()
+                break
+        return invoked
+
+    def next_deadline(self):
+        if self.images and isinstance(self.images[{True: 1, False: 0}[self.hovered]], AnimatedImage):
+            return self.images[{True: 1, False: 0}[self.hovered]].next_deadline()
+        return None
 
     def render(self, screen, delta):
 
         if self.images:
-            if isinstance(self.images[{True: 1, False: 0}[self.hovered]], AnimatedImage):
-                self.images[{True: 1, False: 0}[self.hovered]].tick(delta)
             self.images[{True: 1, False: 0}[self.hovered]].render(screen, self.pos, True)
         else:
-            pygame.draw.rect(screen, self.colours[0] if not self.hovered else self.colours[1], self.button_rect)
+            screen.fill(self.colours[0] if not self.hovered else self.colours[1], self.button_rect)
 
         if self.type == ButtonType.CHECKBOX: 
             # Probably very expensive and has performance impact but.. oh well! 
             # Interior colour also does not account for the main colour being totally black
-            top_offset = self.size.y / 8
-            left_offset = self.size.x / 8
-            interior_rect = pygame.Rect(self.button_rect.left + left_offset, self.button_rect.top + top_offset, self.size.x - left_offset * 2, self.size.y - top_offset * 2)
-            pygame.draw.rect(screen, self.__darken_colour(self.colours[0]) if not self.hovered else self.__darken_colour(self.colours[1]), interior_rect)
+            top_offset = self.button_rect.height / 8
+            left_offset = self.button_rect.width / 8
+            interior_rect = pygame.Rect(self.button_rect.left + left_offset, self.button_rect.top + top_offset, self.button_rect.width - left_offset * 2, self.button_rect.height - top_offset * 2)
+            screen.fill(self.__darken_colour(self.colours[0]) if not self.hovered else self.__darken_colour(self.colours[1]), interior_rect)
 
         if self.title:
-            screen.blit(self.title, self.title.get_rect(center = (self.pos.x, self.pos.y)))
-
-        self.hovered = False
+            screen.blit(self.title, self.title.get_rect(center = (self.screen_pos.x, self.screen_pos.y)))
 
     def __darken_colour(self, colour):
         return (colour[0] - 40, colour[1] - 40, colour[2] - 40)
 
-class ZoomAnimation: # Should support different zooms e.g. linear, lerp, ease in/out via either lambda functions or some setting variable. Also support reversing
-    def __init__(self, frames: int, frame_length: float):
+class InputLayer:
+    """ A group of buttons that share a coordinate space. Layers added later sit on top of earlier ones. """
 
-        self.frames = frames
-        self.frame_length = frame_length
+    def __init__(self, name, buttons, transform = None, active = None, modal = False):
 
-        self.scale_per_frame = 1 / frames
+        self.name = name
+        self.buttons = buttons
+        self.transform = transform # Maps a screen position into the buttons' coordinate space, e.g. InfoBox.screen_to_local
+        self.active = active if active is not None else (lambda: True)
+        self.modal = modal # While active, layers underneath get no input at all
 
-        self.current_frame = 0
-        self.time_until_next = self.frame_length
+        self.grid = {} # (column, row) -> [(button, rect)]
 
-        self.playing = False
+class InputDispatcher:
+    """ Routes mouse input to buttons without checking every button every frame.
 
-    def play(self, size: Point, delta):
-        if not self.playing:
-            self.playing = True
-            self.current_frame = 0
+        Button hit rects are stored in a uniform grid per layer, rebuilt only when the layout changes (rebuild()). Hover is only
+        resolved on MOUSEMOTION and clicks on MOUSEBUTTONDOWN, by looking up the single grid cell under the cursor and giving the
+        event to the top-most button there, so the cost stays flat however many buttons there are. """
+
+    def __init__(self, cell_size = 128):
+
+        self.cell_size = cell_size
+        self.layers = []
+
+        self.hovered = None
+        self.active_layers = ()
+
+    def add_layer(self, layer: InputLayer):
+        self.layers.append(layer)
+        self.index_layer(layer)
+        return layer
+
+    def rebuild(self):
+        """ Call after buttons are added, removed, moved or resized. """
+        for layer in self.layers:
+            self.index_layer(layer)
+
+    def index_layer(self, layer):
+        layer.grid = {}
+        for button in layer.buttons:
+            rect = button.hit_rect()
+            for column in range(int(rect.left // self.cell_size), int(rect.right // self.cell_size) + 1):
+                for row in range(int(rect.top // self.cell_size), int(rect.bottom // self.cell_size) + 1):
+                    layer.grid.setdefault((column, row), []).append((button, rect))
+
+    def find(self, pos):
+        """ The top-most button under a screen position, or None. """
+
+        for layer in reversed(self.layers):
+            if not layer.active():
+                continue
+
+            local = layer.transform(pos) if layer.transform else pos
+            cell = layer.grid.get((int(local[0] // self.cell_size), int(local[1] // self.cell_size)))
+            if cell:
+                for button, rect in reversed(cell):
+                    if rect.collidepoint(local):
+                        return button
+
+            if layer.modal:
+                return None
+
+        return None
+
+    def set_hovered(self, button):
+        if button is self.hovered:
+            return
+        if self.hovered:
+            self.hovered.hovered = False
+        if button:
+            button.hovered = True
+        self.hovered = button
+
+    def sync(self, mouse_pos):
+        """ Re-resolves hover if a layer was switched on or off (e.g. an infobox opened), since the mouse may not have moved. Cheap to call every frame. """
+
+        active_layers = tuple(layer.active() for layer in self.layers)
+        if active_layers != self.active_layers:
+            self.active_layers = active_layers
+            self.hovered = None
+            for layer in self.layers:
+                for button in layer.buttons:
+                    button.hovered = False
+            self.set_hovered(self.find(mouse_pos))
+
+    def handle_event(self, event):
+        """ Returns the actions run by the button that was clicked, or None if nothing was clicked. """
+
+        if event.type == pygame.MOUSEMOTION:
+            self.set_hovered(self.find(event.pos))
+
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            button = self.find(event.pos)
+            self.set_hovered(button)
+            if button:
+                return button.click()
+
+        return None
+
+class ZoomAnimation:
+    """ Grows (or, in reverse, shrinks) something from nothing to its full size, following an easing curve from the tween module.
+        The sizes come from a keyframe table shared by every ZoomAnimation with the same curve, duration and size, and the
+        animation is advanced along with every other tween by tween.animations.advance() in the main loop. """
+
+    def __init__(self, duration: float = 150, curve: str = "ease_out", group: tween.TweenGroup = tween.animations):
+
+        self.duration = duration # Milliseconds
+        self.curve = curve
+        self.group = group
+
+        self.tween = tween.Tween(duration)
+
+    @property
+    def playing(self):
+        return self.tween.playing
 
-        self.time_until_next -= delta
+    def start(self, reverse = False):
+        self.group.start(self.tween, reverse)
 
-        if self.time_until_next <= 0:
-            if self.current_frame < self.frames:
-                self.current_frame += 1
-            elif self.current_frame >= self.frames:
-                self.playing = False
+    def stop(self):
+        self.group.stop(self.tween)
 
-        scale_fact = self.scale_per_frame * self.current_frame
-        return size * scale_fact
+    def seek(self, progress: float):
+        """ Jumps to a point in the animation, from 0 to 1. """
+        self.tween.elapsed = progress * self.duration
+
+    def current_size(self, size: Point):
+        width, height = tween.keyframes(self.curve, self.duration, (int(size.x), int(size.y)))[self.tween.index]
+        return Point(width, height)
+
+    def play(self, size: Point, reverse = False):
+        """ Starts the animation if it is not already running, and returns the current size. """
+        if not self.playing:
+            self.start(reverse)
+
+        return self.current_size(size)
             
 
 class InfoBox:
@@ -150,17 +333,26 @@ class InfoBox:
         # "startup_functions": functions only run in open()
         # "functions": references to functions which can be called by this infobox
         # "funcdata": a list of any data needed to be referenced by those functions
-        # "buttons": a list of Button objects which can be iterated through to run .process() and .render() on each
+        # "buttons": a list of Button objects, rendered onto the infobox and given input through its InputLayer
 
         self.animation = animation
 
         self.newly_opened = True # Tells the infobox that it just switched from closed to open state
 
-        self.mouse_pos = Point(1280, 720)
+        # The composed (unscaled) infobox only changes after redefine_data() or a button changing, so it is cached along with
+        # every scaled copy of it used by the zoom animation. Neither needs re-doing while the infobox sits open.
+        self.composed_surface = None
+        self.composed_state = None
+        self.scaled_surfaces = {} # (width, height) -> scaled copy of composed_surface
 
+    def screen_to_local(self, pos):
+        """ Maps a screen position into the infobox's own coordinates, which its buttons use. """
+        local_pos = Point(pos[0] - ((self.game_res.current_res[0] / 2) - (self.scaled_size.x / 2)), pos[1] - ((self.game_res.current_res[1] / 2) - (self.scaled_size.y / 2)))
+        local_pos *= self.size.x / self.scaled_size.x
+        return local_pos.tuple()
 
-    def adjust_cursor(self, mouse_pos):
-        return Point(mouse_pos.x - ((self.game_res.current_res[0] / 2) - (self.scaled_size.x / 2)), mouse_pos.y - ((self.game_res.current_res[1] / 2) - (self.scaled_size.y / 2)))
+    def accepting_input(self):
+        return not (self.animation and self.animation.playing) # Wait until animation is finished before accepting inputs
 
     def blit_text(self, dest, text, location, centered = False):
         if centered:
@@ -170,35 +362,35 @@ class InfoBox:
 
     def redefine_data(self, data_type, new_data):
         self.data[data_type] = new_data
+        self.composed_state = None # Force a re-compose on the next render
 
-    def open(self, delta):
+    def open(self):
 
         self.newly_opened = True # This is later set to false in main function, after the dimming overlay is rendered
-        self.animation.play(self.size, delta)
-
-    def process(self, mouse_pos: Point, clicks, keys):
-
-        if self.animation and self.animation.playing: # Wait until animation is finished before accepting inputs
-            return
-
-        # Process all inputs
-        self.mouse_pos = self.adjust_cursor(mouse_pos) * (self.size.x / self.scaled_size.x)
-
-        data_buttons = self.data.get("buttons")
-        if data_buttons:
-            for btn in data_buttons:
-                btn.check(self.mouse_pos.tuple(), clicks[0])
+        for btn in self.data.get("buttons") or []: # Hover state is kept between frames, so clear anything left over from when it was last open
+            btn.hovered = False
+        self.animation.play(self.size)
+
+    def next_deadline(self):
+        """ Milliseconds until the infobox looks different without any input, 0 while it is opening. """
+        if self.newly_opened or (self.animation and self.animation.playing):
+            return 0
+        deadlines = [btn.next_deadline() for btn in self.data.get("buttons") or []]
+        return min((deadline for deadline in deadlines if deadline is not None), default = None)
+
+    def button_state(self):
+        """ Everything about the buttons that changes how the infobox looks. """
+        state = []
+        for btn in self.data.get("buttons") or []:
+            image = btn.images[{True: 1, False: 0}[btn.hovered]] if btn.images else None
+            state.append((btn.hovered, btn.title, image.current_frame if isinstance(image, AnimatedImage) else None))
+        return tuple(state)
+
+    def compose(self):
+        if self.composed_surface is None:
+            self.composed_surface = pygame.Surface((self.size.x, self.size.y))
+        infobox_surface = self.composed_surface
 
-
-    def render(self, screen, delta):
-
-        infobox_surface = pygame.Surface((self.size.x, self.size.y))
-
-        final_size = self.scaled_size
-        if self.animation and self.animation.playing:
-            final_size = self.animation.play(self.scaled_size, delta)
-
-        # Rendering
         infobox_surface.fill(Colours.BLACK)
         offset = 5 * self.game_res.scaling_factor.x
         pygame.draw.rect(infobox_surface, Colours.INFOBOX_BORDER, pygame.Rect(offset, offset, self.size.x - offset * 2, self.size.y - offset * 2))
@@ -207,50 +399,153 @@ class InfoBox:
         data_buttons = self.data.get("buttons")
         if data_buttons:
             for btn in data_buttons:
-                btn.render(infobox_surface, delta)
+                btn.render(infobox_surface, 0)
 
         data_text = self.data.get("text")
         if data_text:
             for item in data_text:
                 self.blit_text(infobox_surface, item[0], item[1].tuple(), item[2])
 
+        self.scaled_surfaces.clear()
+
+    def scaled(self, final_size: Point):
+        size = (int(final_size.x), int(final_size.y))
+        if size == self.composed_surface.get_size():
+            return self.composed_surface
+
+        surface = self.scaled_surfaces.get(size)
+        if surface is None:
+            surface = self.scaled_surfaces[size] = pygame.transform.scale(self.composed_surface, size)
+        return surface
+
+    def render(self, screen, delta):
+
+        final_size = self.scaled_size
+        if self.animation and self.animation.playing:
+            final_size = self.animation.play(self.scaled_size)
+
+        # Rendering, only when something has changed
+        state = self.button_state()
+        if state != self.composed_state:
+            self.compose()
+            self.composed_state = state
+
         # Scale and blit surface
-        infobox_surface = pygame.transform.scale(infobox_surface, final_size.tuple())
+        infobox_surface = self.scaled(final_size)
 
         blit_pos = (self.pos.x - (infobox_surface.get_width() / 2), self.pos.y - (infobox_surface.get_height() / 2))
         screen.blit(infobox_surface, blit_pos)
 
         return pygame.Rect(*blit_pos, self.scaled_size.x, self.scaled_size.y)
     
+class RotationCache:
+    """ Pre-rendered copies of a sprite rotated to quantized angles, so animating a rotation only costs a blit.
+        Angles are rounded to the nearest step between min_angle and max_angle. Each angle is rendered the first time it is asked for,
+        or all of them can be rendered up front on a background thread with build_in_background(). """
+
+    def __init__(self, surface, min_angle = -90, max_angle = 90, step = 1.0):
+
+        self.surface = surface
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.step = step
+
+        self.rotations = {} # Quantized step number -> rotated surface
+        self.thread = None
+
+    def key(self, angle):
+        angle = max(self.min_angle, min(self.max_angle, angle))
+        return round((angle - self.min_angle) / self.step)
+
+    def angle_for(self, key):
+        return self.min_angle + key * self.step
+
+    def get(self, angle):
+        key = self.key(angle)
+        rotated = self.rotations.get(key)
+        if rotated is None:
+            rotated = self.rotations[key] = pygame.transform.rotozoom(self.surface, self.angle_for(key), 1)
+        return rotated
+
+    def build_all(self):
+        for key in range(self.key(self.max_angle) + 1):
+            if key not in self.rotations:
+                self.rotations[key] = pygame.transform.rotozoom(self.surface, self.angle_for(key), 1)
+
+    def build_in_background(self):
+        self.thread = threading.Thread(target = self.build_all, daemon = True)
+        self.thread.start()
+
 class SatisfactionDial:
-    def __init__(self, screen, game_res, satisfaction):
+    def __init__(self, screen, game_res, satisfaction, angle_step = 1.0, hand_offset = Point(2, 4), speed = 180):
 
         self.screen = screen
         self.scaling_factor = game_res.scaling_factor
 
-        self.dial = Image("images/dial.png", game_res).return_scaled_image()
-        self.hand = Image("images/dialhand.png", game_res).return_scaled_image()
+        # Kept as Images rather than plain surfaces so they can be packed into a SpriteAtlas
+        self.dial_image = Image("images/dial.png", game_res)
+        self.hand_image = Image("images/dialhand.png", game_res)
+
+        self.hand_offset = hand_offset # Nudges the hand onto the dial's pivot, in unscaled pixels (left, up)
+        self.speed = speed # Degrees per second the hand moves when animating towards its target
+
+        # The rotations are built from a copy, as the background thread locks its surface while the hand is being packed into the atlas
+        self.rotations = RotationCache(self.hand.copy(), -90, 90, angle_step)
+        self.rotations.build_in_background()
 
         self.rotated_rect = None
         self.rotated_hand = None
+        self.hand_angle = 0
+        self.target_angle = 0
         self.rotate_hand(satisfaction)
 
+    @property
+    def dial(self):
+        return self.dial_image.return_scaled_image()
+
+    @property
+    def hand(self):
+        return self.hand_image.return_scaled_image()
+
+    def satisfaction_to_angle(self, satisfaction):
+        return -(-90 + ((satisfaction - 0.6) / (1.2 - 0.6) * (90 - (-90))))
+
+    def set_angle(self, hand_angle):
+        self.hand_angle = hand_angle
+
+        self.rotated_hand = self.rotations.get(hand_angle)
+        self.rotated_rect = self.rotated_hand.get_rect()
+
     def rotate_hand(self, satisfaction):
-        hand_angle = -(-90 + ((satisfaction - 0.6) / (1.2 - 0.6) * (90 - (-90))))
+        """ Snaps the hand straight to satisfaction. """
+        self.target_angle = self.satisfaction_to_angle(satisfaction)
+        self.set_angle(self.target_angle)
 
-        self.rotated_hand = pygame.transform.rotozoom(self.hand, hand_angle, 1)
+    def set_target(self, satisfaction):
+        """ Makes the hand swing smoothly to satisfaction over the next few update() calls. """
+        self.target_angle = self.satisfaction_to_angle(satisfaction)
 
-        pivot_point = (self.dial.get_width() / 2, self.dial.get_height() - (1 * self.scaling_factor.y))
-        offset = pygame.math.Vector2(pivot_point).rotate(hand_angle)
+    def update(self, delta):
+        if self.hand_angle == self.target_angle:
+            return
+
+        max_step = self.speed * delta / 1000
+        difference = self.target_angle - self.hand_angle
+        if abs(difference) <= max_step:
+            self.set_angle(self.target_angle)
+        else:
+            self.set_angle(self.hand_angle + math.copysign(max_step, difference))
 
-        self.rotated_rect = self.rotated_hand.get_rect(center = pivot_point + offset)
+    def next_deadline(self):
+        """ 0 while the hand is swinging towards its target, otherwise None. """
+        return 0 if self.hand_angle != self.target_angle else None
 
     def render(self, pos: Point):
         pos = pos * self.scaling_factor
-        self.screen.blit(self.dial, (pos.x + self.dial.get_width() / 2, pos.y + self.dial.get_height() - (80 * self.scaling_factor.y)))
+        self.screen.blit(self.dial_image.source, (pos.x + self.dial.get_width() / 2, pos.y + self.dial.get_height() - (80 * self.scaling_factor.y)), self.dial_image.area)
 
-        self.rotated_rect.top = pos.y + self.dial.get_height() - self.hand.get_height() + (4 * self.scaling_factor.y)
-        self.rotated_rect.left = pos.x + self.dial.get_width() - self.hand.get_width() / 2 - (2 * self.scaling_factor.x)
+        self.rotated_rect.top = pos.y + self.dial.get_height() - self.hand.get_height() + (self.hand_offset.y * self.scaling_factor.y)
+        self.rotated_rect.left = pos.x + self.dial.get_width() - self.hand.get_width() / 2 - (self.hand_offset.x * self.scaling_factor.x)
 
         self.screen.blit(self.rotated_hand, self.rotated_rect)
 